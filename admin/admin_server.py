@@ -3,20 +3,49 @@
 """
 
 import os
+import re
 import sys
 import json
+import time
 import asyncio
-import subprocess
+import argparse
+import threading
+from itertools import islice
 from datetime import datetime
 from aiohttp import web
 
+from zipstream import ZipEntry, ZipStream
+
 # 配置
 HOST = '127.0.0.1'
 PORT = 8088
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PAPERS_DIR = os.path.join(os.path.dirname(BASE_DIR), 'papers')
+FRONTEND_DIR = os.path.join(os.path.dirname(BASE_DIR), 'frontend')
+DATA_DIR = os.path.join(FRONTEND_DIR, 'public', 'data')
+STATE_FILE = os.path.join(BASE_DIR, 'scraper_state.json')
+STATE_JOURNAL = os.path.join(BASE_DIR, 'scraper_state.journal')
+FILE_URL_PREFIX = "https://src.dselib.com/"
+LOG_FILE = os.path.join(BASE_DIR, 'scraper.log')
+LOG_TAIL_BLOCK = 64 * 1024          # 倒序读取日志的块大小
+LOG_SINCE_MAX_BYTES = 1024 * 1024   # 增量读取单次最多返回的字节数
+LOG_STREAM_POLL = 0.5               # SSE 日志流检查新内容的间隔 (秒)
+LOG_STREAM_HEARTBEAT = 15           # SSE 心跳间隔 (秒)，防止代理断开空闲连接
+EVENT_QUEUE_SIZE = 256              # 每个事件流订阅者的缓冲上限，慢客户端丢弃最旧事件
+PROCESS_LINE_LIMIT = 1024 * 1024    # 子进程单行输出上限
+ASSET_CHECK_INTERVAL = 2.0          # 静态文件服务检查索引是否更新的最小间隔 (秒)
+CACHE_IMMUTABLE = 'public, max-age=31536000, immutable'  # 带 ?v=<md5> 的地址内容不会变
+CACHE_PAPER = 'public, max-age=86400'                     # 未带版本的试卷，过期后凭 ETag 重新验证
+CACHE_REVALIDATE = 'no-cache'                             # 入口文件每次都验证
+REVALIDATE_FILES = {'index.html', 'sw.js', 'manifest.json', 'index.json', 'hashes.json'}
+SUBJECT_KEY = re.compile(r'[a-z0-9_]+')                   # 科目键 (如 phy、chihist)，启动爬虫时校验
 
-# 存储运行中的进程
+# 存储运行中的进程 (asyncio.subprocess.Process)
 running_processes = {}
+# 读取子进程输出的任务，保持引用避免被回收
+output_tasks = {}
+# 进行中的 SSE 连接，服务关闭时统一取消，避免长连接拖住退出
+sse_tasks = set()
 
 
 def log(message):
@@ -42,7 +71,15 @@ async def cors_middleware(app, handler):
 
 # ============ API 路由 ============
 
-def summarize_progress(state: dict) -> dict:
+def subject_from_url(u: str) -> str | None:
+    # https://src.dselib.com/{subject}/{lang}/{year}/{file}
+    if not isinstance(u, str) or not u.startswith(FILE_URL_PREFIX):
+        return None
+    subject = u[len(FILE_URL_PREFIX):].split("/", 1)[0]
+    return subject or None
+
+
+def summarize_progress(progress: dict, per_subject: dict) -> dict:
     """聚合进度信息，便于前端画进度条
 
     说明：
@@ -50,49 +87,8 @@ def summarize_progress(state: dict) -> dict:
       导致管理面板显示“进度丢失/计数不准”。
     - 新实现优先从持久化的 downloaded_files/failed_urls/seen_urls 推导“累计计数”，
       progress 仅作为补充（提供 total_urls 与 completed/timestamp）。
+    - per_subject 由 StateCache 随状态增量维护，这里只做 O(科目数) 的汇总。
     """
-    progress = state.get('progress', {}) or {}
-    downloaded_files = state.get('downloaded_files', []) or []
-    failed_urls = state.get('failed_urls', {}) or {}
-    seen_urls = state.get('seen_urls', []) or []
-
-    # 统计每科目累计 downloaded / failed / seen
-    def _subject_from_url(u: str) -> str | None:
-        # https://src.dselib.com/{subject}/{lang}/{year}/{file}
-        if not isinstance(u, str):
-            return None
-        prefix = "https://src.dselib.com/"
-        if not u.startswith(prefix):
-            return None
-        rest = u[len(prefix):]
-        parts = rest.split("/")
-        return parts[0] if parts and parts[0] else None
-
-    subjects_set = set(progress.keys())
-    subjects_set.update(filter(None, (_subject_from_url(u) for u in downloaded_files)))
-    subjects_set.update(filter(None, (_subject_from_url(u) for u in failed_urls.keys())))
-    subjects_set.update(filter(None, (_subject_from_url(u) for u in seen_urls)))
-
-    per_subject = {k: {'downloaded': 0, 'failed': 0, 'seen': 0} for k in subjects_set}
-
-    for u in downloaded_files:
-        k = _subject_from_url(u)
-        if k:
-            per_subject.setdefault(k, {'downloaded': 0, 'failed': 0, 'seen': 0})
-            per_subject[k]['downloaded'] += 1
-
-    for u in failed_urls.keys():
-        k = _subject_from_url(u)
-        if k:
-            per_subject.setdefault(k, {'downloaded': 0, 'failed': 0, 'seen': 0})
-            per_subject[k]['failed'] += 1
-
-    for u in seen_urls:
-        k = _subject_from_url(u)
-        if k:
-            per_subject.setdefault(k, {'downloaded': 0, 'failed': 0, 'seen': 0})
-            per_subject[k]['seen'] += 1
-
     subjects = []
     total_urls = 0
     total_downloaded = 0
@@ -100,7 +96,7 @@ def summarize_progress(state: dict) -> dict:
     total_seen = 0
     done = 0
 
-    for key in sorted(subjects_set):
+    for key in sorted(set(progress) | set(per_subject)):
         info = progress.get(key, {}) or {}
         urls = info.get('total_urls', 0) or 0
 
@@ -152,43 +148,285 @@ def summarize_progress(state: dict) -> dict:
     }
 
 
-async def get_status(request):
-    """获取系统状态"""
-    state_file = os.path.join(BASE_DIR, 'scraper_state.json')
-    state = {}
-    
-    if os.path.exists(state_file):
+def file_signature(path: str):
+    """(inode, size, mtime_ns)，文件不存在时为 None"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class StateCache:
+    """爬虫状态的内存缓存：快照 scraper_state.json + 增量重放 scraper_state.journal
+
+    - 快照签名 (inode, size, mtime) 变化 (爬虫压缩状态 / 清除状态) 时整体重新加载
+    - 否则只读取 journal 上次读到的位置之后新追加的记录
+    - 每科目 downloaded / failed / seen 计数随记录增量维护，汇总结果缓存到状态再次变化为止
+    轮询 /api/status 的开销因此只与新增记录数有关，而与 seen_urls 总量无关。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.snapshot_sig = None
+        self.journal_pos = None  # (inode, 已读取的字节偏移)
+        self.downloaded: dict = {}  # 有序集合 url -> None，保持写入顺序以取“最近”记录
+        self.failed: dict = {}
+        self.seen: set = set()
+        self.progress: dict = {}
+        self.per_subject: dict = {}
+        self.last_update = None
+        self.error = None
+        self._summary = None
+
+    def _counts(self, url: str) -> dict | None:
+        subject = subject_from_url(url)
+        if not subject:
+            return None
+        return self.per_subject.setdefault(subject, {'downloaded': 0, 'failed': 0, 'seen': 0})
+
+    def _add_seen(self, url: str, counts: dict | None):
+        if url not in self.seen:
+            self.seen.add(url)
+            if counts:
+                counts['seen'] += 1
+
+    def _apply(self, record: dict, track_seen: bool = True):
+        if 'u' in record:
+            url = record['u']
+            counts = self._counts(url)
+            if record.get('r') == 'ok':
+                if url not in self.downloaded:
+                    self.downloaded[url] = None
+                    if counts:
+                        counts['downloaded'] += 1
+                if self.failed.pop(url, None) is not None and counts:
+                    counts['failed'] -= 1
+            else:
+                if url not in self.failed and counts:
+                    counts['failed'] += 1
+                self.failed[url] = record.get('r', 'exception')
+            # 暂时性失败 ("t") 不算已见过，爬虫下次运行会重试
+            if track_seen and not record.get('t'):
+                self._add_seen(url, counts)
+        elif 'p' in record:
+            self.progress[record['p']] = record.get('v', {})
+
+    def _load_snapshot(self):
+        if not os.path.exists(STATE_FILE):
+            return
         try:
-            with open(state_file, 'r', encoding='utf-8') as f:
+            with open(STATE_FILE, 'r', encoding='utf-8') as f:
                 state = json.load(f)
         except Exception as e:
-            state = {'error': str(e)}
-    
+            self.error = str(e)
+            return
+        # 快照中 seen 计数只以 seen_urls 为准 (与 journal 中的记录不同)
+        for url in state.get('downloaded_files', []) or []:
+            self._apply({'u': url, 'r': 'ok'}, track_seen=False)
+        for url, reason in (state.get('failed_urls', {}) or {}).items():
+            self._apply({'u': url, 'r': reason}, track_seen=False)
+        for url in state.get('seen_urls', []) or []:
+            self._add_seen(url, self._counts(url))
+        self.progress = state.get('progress', {}) or {}
+        self.last_update = state.get('last_update')
+
+    def _replay_journal(self, inode: int):
+        offset = self.journal_pos[1] if self.journal_pos and self.journal_pos[0] == inode else 0
+        try:
+            with open(STATE_JOURNAL, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+                mtime = os.fstat(f.fileno()).st_mtime
+        except FileNotFoundError:
+            return
+        cut = data.rfind(b'\n') + 1  # 只处理完整的行，半行留到下次
+        if not cut:
+            return
+        for line in data[:cut].decode('utf-8', errors='replace').splitlines():
+            try:
+                self._apply(json.loads(line))
+            except (ValueError, AttributeError):
+                continue
+        self.journal_pos = (inode, offset + cut)
+        self.last_update = datetime.fromtimestamp(mtime).isoformat()
+        self._summary = None
+
+    def refresh(self):
+        snapshot = file_signature(STATE_FILE)
+        journal = file_signature(STATE_JOURNAL)
+        if snapshot != self.snapshot_sig or (self.journal_pos and (
+                journal is None or journal[0] != self.journal_pos[0] or journal[1] < self.journal_pos[1])):
+            self._reset()
+            self._load_snapshot()
+            self.snapshot_sig = snapshot
+        if journal is not None:
+            self._replay_journal(journal[0])
+
+    def status(self) -> dict:
+        """刷新并返回 /api/status 中与爬虫状态相关的部分"""
+        with self.lock:
+            self.refresh()
+            if self._summary is None:
+                self._summary = summarize_progress(self.progress, self.per_subject)
+            state = {
+                'downloaded_files': len(self.downloaded),
+                'failed_urls': len(self.failed),
+                'last_update': self.last_update,
+                'progress': self.progress,
+                'summary': self._summary,
+            }
+            if self.error:
+                state['error'] = self.error
+            return {
+                'state': state,
+                'files': {
+                    'downloaded': list(islice(reversed(self.downloaded), 100))[::-1],  # 最近100个
+                    'failed': dict(list(islice(reversed(self.failed.items()), 50))[::-1]),  # 最近50个
+                }
+            }
+
+
+state_cache = StateCache()
+
+
+class EventHub:
+    """子进程实时事件的分发中心
+
+    子进程输出由 pump_output 逐行读取后发布到这里，再推送给 /api/events 的每个订阅者；
+    latest 保存各进程最近一次 progress 事件，新连接的面板立即可以显示当前进度。
+    """
+
+    def __init__(self):
+        self.subscribers: set = set()
+        self.latest: dict = {}
+
+    def publish(self, event: dict):
+        if event['type'] == 'progress':
+            self.latest[event['name']] = event
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+
+event_hub = EventHub()
+
+
+def is_running(name: str) -> bool:
+    proc = running_processes.get(name)
+    return proc is not None and proc.returncode is None
+
+
+async def read_output_lines(stream):
+    """逐行产出子进程输出 (不含超长行)
+
+    超过 PROCESS_LINE_LIMIT 的行会让 readline / async for 抛出 ValueError 并中断读取；
+    这里改用 readuntil，超长时丢弃已缓冲部分并跳过该行余下内容，产出 None 作为占位，继续读取后续行。
+    """
+    skipping = False
+    while True:
+        try:
+            raw = await stream.readuntil(b'\n')
+        except asyncio.IncompleteReadError as e:
+            if e.partial and not skipping:
+                yield e.partial
+            return
+        except asyncio.LimitOverrunError as e:
+            await stream.readexactly(e.consumed)
+            if not skipping:
+                skipping = True
+                yield None
+            continue
+        if skipping:
+            skipping = False
+            continue
+        yield raw
+
+
+async def pump_output(name: str, proc):
+    """持续读取子进程输出，避免管道写满后子进程阻塞
+
+    爬虫以 --events 启动，每行是 JSON：带 event 字段的是结构化事件，带 msg 的是日志记录；
+    其它进程 (索引器) 的普通文本行作为 output 事件转发。读取出错时也保证发出 exit 事件并清理任务登记。
+    """
+    returncode = None
+    try:
+        async for raw in read_output_lines(proc.stdout):
+            if raw is None:
+                log(f"{name} 输出了超过 {PROCESS_LINE_LIMIT} 字节的一行，已丢弃")
+                event_hub.publish({'type': 'output', 'name': name,
+                                   'line': f"[超过 {PROCESS_LINE_LIMIT} 字节的输出行已丢弃]"})
+                continue
+            line = raw.decode('utf-8', errors='replace').rstrip('\r\n')
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if isinstance(record, dict) and record.get('event'):
+                event_hub.publish({'type': record.pop('event'), 'name': name, **record})
+            elif isinstance(record, dict) and 'msg' in record:
+                event_hub.publish({'type': 'log', 'name': name, **record})
+            else:
+                event_hub.publish({'type': 'output', 'name': name, 'line': line})
+        returncode = await proc.wait()
+    except Exception as e:
+        log(f"读取{name}输出失败: {e!r}")
+    finally:
+        log(f"{name} 已退出 (返回码 {returncode})")
+        event_hub.publish({'type': 'exit', 'name': name, 'returncode': returncode})
+        output_tasks.pop(name, None)
+
+
+async def start_process(name: str, cmd: list):
+    log(f"启动{name}: {' '.join(cmd)}")
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        cwd=BASE_DIR,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        limit=PROCESS_LINE_LIMIT,
+        env={**os.environ, 'PYTHONUNBUFFERED': '1', 'PYTHONIOENCODING': 'utf-8'},
+    )
+    running_processes[name] = proc
+    event_hub.latest.pop(name, None)
+    event_hub.publish({'type': 'start', 'name': name, 'cmd': cmd})
+    output_tasks[name] = asyncio.create_task(pump_output(name, proc))
+    return proc
+
+
+async def get_status(request):
+    """获取系统状态"""
     # 检查进程状态
     processes = {}
-    for name, proc in list(running_processes.items()):
-        if proc.poll() is None:
+    for name in list(running_processes):
+        if is_running(name):
             processes[name] = 'running'
         else:
             processes[name] = 'stopped'
             del running_processes[name]
     
-    summary = summarize_progress(state)
+    status = await asyncio.to_thread(state_cache.status)
     
     return web.json_response({
         'status': 'ok',
         'processes': processes,
-        'state': {
-            'downloaded_files': len(state.get('downloaded_files', [])),
-            'failed_urls': len(state.get('failed_urls', {})),
-            'last_update': state.get('last_update', None),
-            'progress': state.get('progress', {}),
-            'summary': summary
-        },
-        'files': {
-            'downloaded': list(state.get('downloaded_files', []))[-100:],  # 最近100个
-            'failed': dict(list(state.get('failed_urls', {}).items())[-50:])  # 最近50个
-        }
+        # 子进程最近一次进度事件 (实时，来自管道)
+        'live': event_hub.latest,
+        **status,
     })
 
 
@@ -196,36 +434,43 @@ async def run_scraper(request):
     """启动爬虫"""
     data = await request.json() if request.body_exists else {}
     subjects = data.get('subjects', [])
+    refresh = bool(data.get('refresh'))
+    exhaustive = bool(data.get('exhaustive'))
+
+    if not isinstance(subjects, list) or not all(
+            isinstance(s, str) and SUBJECT_KEY.fullmatch(s) for s in subjects):
+        return web.json_response({
+            'status': 'error',
+            'message': f'科目参数无效: {subjects!r}'
+        }, status=400)
     
-    if 'scraper' in running_processes and running_processes['scraper'].poll() is None:
+    if is_running('scraper'):
         return web.json_response({
             'status': 'error',
             'message': '爬虫已在运行中'
         }, status=400)
     
-    cmd = [sys.executable, os.path.join(BASE_DIR, 'scraper.py')]
+    cmd = [sys.executable, os.path.join(BASE_DIR, 'scraper.py'), '--events']
+    if refresh:
+        cmd.append('--refresh')
+    if exhaustive:
+        cmd.append('--exhaustive')
     if subjects:
+        # "--" 之后的参数一律按科目解析，不会被当成爬虫选项
+        cmd.append('--')
         cmd.extend(subjects)
     
-    log(f"启动爬虫: {' '.join(cmd)}")
-    proc = subprocess.Popen(
-        cmd,
-        cwd=BASE_DIR,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True
-    )
-    running_processes['scraper'] = proc
+    await start_process('scraper', cmd)
     
     return web.json_response({
         'status': 'ok',
-        'message': f'爬虫已启动，目标科目: {subjects if subjects else "全部"}'
+        'message': f'爬虫已启动{"(刷新模式)" if refresh else ""}，目标科目: {subjects if subjects else "全部"}'
     })
 
 
 async def run_indexer(request):
     """运行索引器"""
-    if 'indexer' in running_processes and running_processes['indexer'].poll() is None:
+    if is_running('indexer'):
         return web.json_response({
             'status': 'error',
             'message': '索引器已在运行中'
@@ -233,15 +478,7 @@ async def run_indexer(request):
     
     cmd = [sys.executable, os.path.join(BASE_DIR, 'indexer.py')]
     
-    log(f"启动索引器: {' '.join(cmd)}")
-    proc = subprocess.Popen(
-        cmd,
-        cwd=BASE_DIR,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True
-    )
-    running_processes['indexer'] = proc
+    await start_process('indexer', cmd)
     
     return web.json_response({
         'status': 'ok',
@@ -256,7 +493,7 @@ async def stop_process(request):
     
     if name in running_processes:
         proc = running_processes[name]
-        if proc.poll() is None:
+        if proc.returncode is None:
             proc.terminate()
             log(f"已停止: {name}")
             return web.json_response({
@@ -270,21 +507,289 @@ async def stop_process(request):
     }, status=400)
 
 
+async def stream_events(request):
+    """SSE 实时事件流 (子进程进度/日志/输出/退出)，数据来自子进程管道，不读磁盘
+
+    参数 types 可只订阅部分类型，如 ?types=progress,exit。
+    事件名即类型 (start / progress / log / output / exit)，data 为事件 JSON。
+    progress 事件字段: files_per_sec, bytes_per_sec, urls_per_sec, queue_depth, in_flight,
+    concurrency, retries, subjects (各科目 downloaded / found / probed / planned / completed)
+    """
+    types = set(request.query['types'].split(',')) if request.query.get('types') else None
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+        'Access-Control-Allow-Origin': '*',
+    })
+    await response.prepare(request)
+    sse_tasks.add(asyncio.current_task())
+
+    async def send(event: dict):
+        if types is None or event['type'] in types:
+            payload = json.dumps(event, ensure_ascii=False)
+            await response.write(f"event: {event['type']}\ndata: {payload}\n\n".encode('utf-8'))
+
+    queue = event_hub.subscribe()
+    try:
+        for event in list(event_hub.latest.values()):
+            await send(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), LOG_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                await response.write(b": ping\n\n")
+                continue
+            await send(event)
+    except ConnectionResetError:
+        pass
+    finally:
+        event_hub.unsubscribe(queue)
+        sse_tasks.discard(asyncio.current_task())
+    return response
+
+
+def parse_log_line(line: str) -> dict:
+    """解析一行日志：JSON Lines 记录，兼容旧版纯文本行"""
+    try:
+        record = json.loads(line)
+        if isinstance(record, dict):
+            return record
+    except ValueError:
+        pass
+    return {'ts': '', 'level': '', 'msg': line.rstrip('\n')}
+
+
+def format_log_record(record: dict) -> str:
+    if not record.get('ts'):
+        return record.get('msg', '')
+    return f"[{record['ts'][:19].replace('T', ' ')}] [{record.get('level', '')}] {record.get('msg', '')}"
+
+
+def match_log_line(line: str, levels: set = None, subject: str = None, q: str = None):
+    """按条件过滤一行日志，匹配时返回解析后的记录，否则返回 None
+
+    纯文本子串 q 先在原始行上判断，不匹配的行不做 JSON 解析。
+    """
+    if q and q not in line:
+        return None
+    record = parse_log_line(line)
+    if levels and record.get('level') not in levels:
+        return None
+    if subject and record.get('subject') != subject:
+        return None
+    if q and q not in record.get('msg', ''):
+        return None
+    return record
+
+
+def parse_levels(level: str = None):
+    return {l.strip().upper() for l in level.split(',')} if level else None
+
+
+def iter_lines_reversed(f, end: int = None):
+    """从已打开文件的 end (默认文件末尾) 向前按块读取，倒序产出完整的行
+
+    end 为 None 时末尾未写完的半行跳过；给定的 end 应位于行边界 (如 complete_size 的结果)。
+    只读取实际需要的尾部数据，耗时与返回行数相关而与文件大小无关。
+    """
+    pos = f.seek(0, os.SEEK_END) if end is None else end
+    rest = b''
+    skip_tail = end is None
+    while pos > 0:
+        step = min(LOG_TAIL_BLOCK, pos)
+        pos -= step
+        f.seek(pos)
+        parts = (f.read(step) + rest).split(b'\n')
+        rest = parts.pop(0)  # 行首可能在更前面的块里
+        if skip_tail and parts:
+            parts.pop()
+            skip_tail = False
+        for line in reversed(parts):
+            if line:
+                yield line.decode('utf-8', errors='replace')
+    if rest and not skip_tail:
+        yield rest.decode('utf-8', errors='replace')
+
+
+def log_file_id(path: str):
+    """日志文件标识 (inode)；轮转时文件被改名为 .1，标识随文件走，可据此识别游标所在文件"""
+    try:
+        return os.stat(path).st_ino
+    except FileNotFoundError:
+        return None
+
+
+def read_complete(path: str, offset: int, limit: int):
+    """从 offset 读取最多 limit 字节，截到最后一个换行；返回 (数据, 新偏移, 是否还有更多)"""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(limit)
+    cut = data.rfind(b'\n') + 1
+    return data[:cut], offset + cut, len(data) == limit
+
+
+def complete_size(f) -> int:
+    """已打开文件中最后一个完整行结束的位置 (跳过正在写入的半行)"""
+    size = os.fstat(f.fileno()).st_size
+    start = max(0, size - LOG_TAIL_BLOCK)
+    f.seek(start)
+    data = f.read(size - start)
+    return start + data.rfind(b'\n') + 1
+
+
+def filter_log_data(data: bytes, levels: set = None, subject: str = None, q: str = None) -> list:
+    records = []
+    for line in data.decode('utf-8', errors='replace').splitlines():
+        record = match_log_line(line, levels, subject, q) if line else None
+        if record is not None:
+            records.append(record)
+    return records
+
+
+def read_log(lines: int = 100, level: str = None, subject: str = None, q: str = None) -> dict:
+    """读取最近 lines 条符合条件的日志记录
+
+    从当前文件末尾倒序扫描，不够时继续扫描上一个轮转文件 (.1)，凑满即停。
+    同时返回当前文件的游标 (file, offset)，供 ?since= 增量读取。
+    游标在扫描前从同一个打开的文件取得，且只扫描到游标处：扫描期间追加的行留给下一次增量读取，
+    扫描期间发生轮转时游标仍对应本文件 (已改名为 .1)，不会与其它文件错配。
+    """
+    levels = parse_levels(level)
+    matched = []
+
+    def collect(f, end=None):
+        for line in iter_lines_reversed(f, end):
+            record = match_log_line(line, levels, subject, q)
+            if record is not None:
+                matched.append(record)
+                if len(matched) >= lines:
+                    return
+
+    file_id, offset = None, 0
+    try:
+        with open(LOG_FILE, 'rb') as f:
+            file_id = os.fstat(f.fileno()).st_ino
+            offset = complete_size(f)
+            collect(f, offset)
+    except FileNotFoundError:
+        pass
+    if len(matched) < lines:
+        try:
+            with open(LOG_FILE + '.1', 'rb') as f:
+                # 扫描当前文件时刚好轮转，.1 就是已扫描过的文件
+                if os.fstat(f.fileno()).st_ino != file_id:
+                    collect(f)
+        except FileNotFoundError:
+            pass
+    matched.reverse()
+    return {'records': matched, 'file': file_id, 'offset': offset}
+
+
+def read_log_since(file_id, offset: int, level: str = None, subject: str = None, q: str = None) -> dict:
+    """增量读取游标 (file, offset) 之后新写入的日志
+
+    - 游标所在文件已轮转为 .1：先读完 .1 的剩余部分，再从当前文件开头继续
+    - 游标所在文件已不存在或被截断：从当前文件开头读，并返回 reset=True
+    单次最多 LOG_SINCE_MAX_BYTES，more=True 时客户端应立即用新游标再取一次。
+    """
+    levels = parse_levels(level)
+    current_id = log_file_id(LOG_FILE)
+    reset = False
+    if file_id is not None and file_id != current_id:
+        if log_file_id(LOG_FILE + '.1') == file_id:
+            data, new_offset, _ = read_complete(LOG_FILE + '.1', offset, LOG_SINCE_MAX_BYTES)
+            if data:
+                return {'records': filter_log_data(data, levels, subject, q),
+                        'file': file_id, 'offset': new_offset, 'more': True, 'reset': False}
+        else:
+            reset = True
+        offset = 0
+    if current_id is None:
+        return {'records': [], 'file': None, 'offset': 0, 'more': False, 'reset': reset}
+    if offset > os.path.getsize(LOG_FILE):
+        offset, reset = 0, True
+    data, new_offset, more = read_complete(LOG_FILE, offset, LOG_SINCE_MAX_BYTES)
+    return {'records': filter_log_data(data, levels, subject, q),
+            'file': current_id, 'offset': new_offset, 'more': more, 'reset': reset}
+
+
+def parse_log_cursor(value: str):
+    """解析游标 "file:offset" (或只有 offset)"""
+    file_part, _, offset_part = value.rpartition(':')
+    return (int(file_part) if file_part else None), int(offset_part or 0)
+
+
 async def get_log(request):
-    """获取日志内容"""
-    log_file = os.path.join(BASE_DIR, 'scraper.log')
-    lines = int(request.query.get('lines', 100))
-    
-    if not os.path.exists(log_file):
-        return web.json_response({'log': ''})
-    
+    """获取日志内容
+
+    参数: lines (条数), level (如 WARN,ERROR), subject (科目), q (消息包含的文本)
+    增量模式: since=<offset> 与 file=<上次返回的 file>，只返回该位置之后的新日志
+    返回可读文本 log、结构化 records 以及下一次请求用的游标 file / offset
+    """
+    query = request.query
+    filters = (query.get('level'), query.get('subject'), query.get('q'))
     try:
-        with open(log_file, 'r', encoding='utf-8') as f:
-            all_lines = f.readlines()
-            content = ''.join(all_lines[-lines:])
-        return web.json_response({'log': content})
+        if 'since' in query:
+            file_id = int(query['file']) if query.get('file') else None
+            result = await asyncio.to_thread(read_log_since, file_id, int(query['since']), *filters)
+        else:
+            result = await asyncio.to_thread(read_log, int(query.get('lines', 100)), *filters)
+        result['log'] = ''.join(format_log_record(r) + '\n' for r in result['records'])
+        return web.json_response(result)
     except Exception as e:
-        return web.json_response({'log': f'读取日志失败: {e}'})
+        return web.json_response({'log': f'读取日志失败: {e}', 'records': []})
+
+
+async def stream_log(request):
+    """SSE 实时日志流
+
+    连接后先推送最近 lines 条 (默认 100)，之后每 LOG_STREAM_POLL 秒推送新增日志。
+    每个事件 data 为 {"records": [...]}，id 为游标 "file:offset"；
+    断线重连时浏览器自动带上 Last-Event-ID，从断点继续而不重复。
+    """
+    query = request.query
+    filters = (query.get('level'), query.get('subject'), query.get('q'))
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+        'Access-Control-Allow-Origin': '*',
+    })
+    await response.prepare(request)
+    sse_tasks.add(asyncio.current_task())
+
+    async def send(result: dict):
+        payload = json.dumps({'records': result['records']}, ensure_ascii=False)
+        await response.write(f"id: {result['file']}:{result['offset']}\nevent: log\ndata: {payload}\n\n".encode('utf-8'))
+
+    loop = asyncio.get_running_loop()
+    try:
+        last_event_id = request.headers.get('Last-Event-ID')
+        if last_event_id:
+            file_id, offset = parse_log_cursor(last_event_id)
+        else:
+            result = await asyncio.to_thread(read_log, int(query.get('lines', 100)), *filters)
+            await send(result)
+            file_id, offset = result['file'], result['offset']
+        last_write = loop.time()
+        while True:
+            result = await asyncio.to_thread(read_log_since, file_id, offset, *filters)
+            moved = (result['file'], result['offset']) != (file_id, offset)
+            file_id, offset = result['file'], result['offset']
+            if result['records'] or (moved and result['reset']):
+                await send(result)
+                last_write = loop.time()
+            elif loop.time() - last_write >= LOG_STREAM_HEARTBEAT:
+                await response.write(b": ping\n\n")
+                last_write = loop.time()
+            if not result['more']:
+                await asyncio.sleep(LOG_STREAM_POLL)
+    except ConnectionResetError:
+        pass
+    finally:
+        sse_tasks.discard(asyncio.current_task())
+    return response
 
 
 async def get_subjects(request):
@@ -312,14 +817,274 @@ async def get_subjects(request):
     return web.json_response({'subjects': subjects})
 
 
+def _match_dirs(path: str, wanted: set | None) -> list:
+    """列出 path 下名称 (不区分大小写) 在 wanted 中的子目录；wanted 为 None 时返回全部，跳过隐藏目录"""
+    try:
+        with os.scandir(path) as it:
+            entries = [e for e in it if e.is_dir() and not e.name.startswith('.')]
+    except FileNotFoundError:
+        return []
+    return sorted((e for e in entries if wanted is None or e.name.lower() in wanted), key=lambda e: e.name)
+
+
+def _split_param(value: str | None) -> set | None:
+    values = {v.strip().lower() for v in value.split(',') if v.strip()} if value else set()
+    return values or None
+
+
+def select_papers(subjects: set, exams: set = None, langs: set = None, years: set = None) -> list:
+    """按 科目/考试/语言/年份 选择 papers/ 下的文件，返回 ZipEntry 列表
+
+    只在实际存在的目录名中匹配，不把请求参数拼进路径，避免路径穿越。
+    条目名为相对 papers/ 的路径，如 phy/dse/eng/2012/p1.pdf。
+    """
+    entries = []
+    for subject in _match_dirs(PAPERS_DIR, subjects):
+        for exam in _match_dirs(subject.path, exams):
+            for lang in _match_dirs(exam.path, langs):
+                for year in _match_dirs(lang.path, years):
+                    with os.scandir(year.path) as it:
+                        files = sorted((e for e in it if e.is_file() and not e.name.startswith('.')),
+                                       key=lambda e: e.name)
+                    for f in files:
+                        st = f.stat()
+                        arcname = '/'.join((subject.name, exam.name, lang.name, year.name, f.name))
+                        entries.append(ZipEntry(arcname, f.path, st.st_size, st.st_mtime))
+    return entries
+
+
+async def download_zip(request):
+    """打包下载 (流式 ZIP，STORE 模式)
+
+    参数: subject (必填)、exam、lang、year，均可用逗号分隔多个值，如
+    /api/zip?subject=phy&exam=dse&year=2012,2013
+    边读文件边输出，内存占用恒定，不生成临时文件；响应带 Content-Length，浏览器可显示进度。
+    """
+    query = request.query
+    subjects = _split_param(query.get('subject'))
+    if not subjects:
+        return web.json_response({'status': 'error', 'message': '缺少参数 subject'}, status=400)
+
+    entries = await asyncio.to_thread(select_papers, subjects, _split_param(query.get('exam')),
+                                      _split_param(query.get('lang')), _split_param(query.get('year')))
+    if not entries:
+        return web.json_response({'status': 'error', 'message': '没有符合条件的文件'}, status=404)
+
+    stream = ZipStream(entries)
+    name = '_'.join(query[k] for k in ('subject', 'exam', 'lang', 'year') if query.get(k))
+    name = re.sub(r'[^A-Za-z0-9_-]+', '-', name) + '.zip'
+    response = web.StreamResponse(headers={
+        'Content-Type': 'application/zip',
+        'Content-Disposition': f'attachment; filename="{name}"',
+        'Access-Control-Allow-Origin': '*',
+    })
+    response.content_length = stream.total_size()
+    await response.prepare(request)
+
+    chunks = stream.chunks()
+    try:
+        # 文件读取在线程中进行；response.write 等待客户端消费，慢客户端不会让数据堆积在内存
+        while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+            await response.write(chunk)
+    except ConnectionResetError:
+        return response
+    finally:
+        try:
+            chunks.close()
+        except ValueError:  # 取消时生成器可能仍在线程中执行
+            pass
+    await response.write_eof()
+    log(f"打包下载: {name} ({len(entries)} 个文件, {response.content_length / 1024 / 1024:.1f} MB)")
+    return response
+
+
+# ============ 静态文件服务 ============
+
+class AssetHashes:
+    """静态文件绝对路径 -> 索引中记录的 md5，用作强 ETag
+
+    来源: hashes.json (public/data 下的 JSON 输出) 与各科目分片 (试卷文件、年份 ZIP 包)。
+    index.json / hashes.json 的签名变化时整体重新加载，最多每 ASSET_CHECK_INTERVAL 秒检查一次。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.signature = None
+        self.hashes = {}
+        self.checked = 0.0
+
+    def _load(self) -> dict:
+        hashes = {}
+        try:
+            with open(os.path.join(DATA_DIR, 'hashes.json'), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            for name, info in manifest.get('files', {}).items():
+                hashes[os.path.normpath(os.path.join(DATA_DIR, name))] = info['md5']
+            with open(os.path.join(DATA_DIR, 'index.json'), 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError, KeyError):
+            return hashes
+
+        def add(rel_path, md5):
+            hashes[os.path.normpath(os.path.join(FRONTEND_DIR, rel_path))] = md5
+
+        for subject in index.get('subjects', []):
+            data = subject
+            if 'shard' in subject:
+                try:
+                    with open(os.path.join(DATA_DIR, subject['shard']['path']), 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except (OSError, ValueError):
+                    continue
+            columnar = data.get('layout') == 'columnar'
+            fields = data.get('file_fields', ['name', 'size', 'md5'])
+            for exam in data.get('exams', {}).values():
+                for year in exam.get('years', {}).values():
+                    for lang in year.get('languages', {}).values():
+                        if 'bundle' in lang:
+                            add(lang['bundle']['path'], lang['bundle']['md5'])
+                        for f in lang.get('files', []):
+                            if columnar:
+                                row = dict(zip(fields, f))
+                                add(f"{lang['dir']}/{row['name']}", row['md5'])
+                            elif f.get('md5'):
+                                add(f['path'], f['md5'])
+        return hashes
+
+    def refresh(self):
+        signature = (file_signature(os.path.join(DATA_DIR, 'index.json')),
+                     file_signature(os.path.join(DATA_DIR, 'hashes.json')))
+        with self.lock:
+            if signature != self.signature:
+                self.hashes = self._load()
+                self.signature = signature
+
+    async def get(self, path: str) -> str | None:
+        now = time.monotonic()
+        if now - self.checked >= ASSET_CHECK_INTERVAL:
+            self.checked = now
+            await asyncio.to_thread(self.refresh)
+        return self.hashes.get(path)
+
+
+asset_hashes = AssetHashes()
+
+
+def resolve_static(root: str, rel_path: str) -> str | None:
+    """URL 路径 -> root 下的文件路径；拒绝 .. 与隐藏文件/目录 (如去重的 .objects)"""
+    parts = [part for part in rel_path.split('/') if part]
+    if any(part.startswith('.') or '\\' in part for part in parts):
+        return None
+    return os.path.join(root, *parts)
+
+
+def etag_matches(etags, md5: str, weak: bool = True) -> str | None:
+    """ETag 列表命中内容 md5 (含预压缩变体 md5-gzip / md5-br) 时返回命中的 ETag
+
+    weak=False 为强比较 (If-Match / If-Range)，弱 ETag (W/"...") 不算命中。
+    """
+    for etag in etags or ():
+        if not weak and etag.is_weak:
+            continue
+        if etag.value == '*' or etag.value.split('-', 1)[0] == md5:
+            return etag.value
+    return None
+
+
+class ContentFileResponse(web.FileResponse):
+    """条件请求已在 serve_static 中按内容 md5 判定的 FileResponse
+
+    FileResponse 会再拿自己的 mtime-size ETag 比较 If-Match / If-None-Match (If-Match: "<md5>" 会得到 412)，
+    且不认 ETag 形式的 If-Range；发送前去掉这些请求头，If-Range 不命中时一并去掉 Range，返回完整内容。
+    """
+
+    def __init__(self, path: str, range_allowed: bool = True, **kwargs):
+        super().__init__(path, **kwargs)
+        self.range_allowed = range_allowed
+
+    async def prepare(self, request):
+        dropped = {'if-match', 'if-none-match'}
+        if request.headers.get('If-Range', '').startswith(('"', 'W/')):
+            dropped.add('if-range')
+        if not self.range_allowed:
+            dropped.add('range')
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in dropped}
+        return await super().prepare(request.clone(headers=headers))
+
+
+async def serve_static(request, root: str):
+    """发送静态文件
+
+    FileResponse 负责 sendfile 零拷贝发送、Range/206、.br/.gz 预压缩变体的协商；
+    这里补充基于索引 md5 的强 ETag、条件请求 (If-Match / If-None-Match / If-Range) 与缓存策略。
+    """
+    rel_path = request.match_info['path']
+    if rel_path == '' or rel_path.endswith('/'):
+        rel_path += 'index.html'
+    path = resolve_static(root, rel_path)
+    if path is None:
+        raise web.HTTPNotFound()
+    md5 = await asset_hashes.get(path)
+
+    name = os.path.basename(path)
+    if 'v' in request.query:
+        cache_control = CACHE_IMMUTABLE
+    elif name in REVALIDATE_FILES or md5 is None:
+        cache_control = CACHE_REVALIDATE
+    else:
+        cache_control = CACHE_PAPER
+    headers = {'Cache-Control': cache_control}
+    if name.endswith('.json'):
+        headers['Vary'] = 'Accept-Encoding'
+
+    if md5 is None:
+        return web.FileResponse(path, headers=headers)
+    if not os.path.isfile(path):
+        raise web.HTTPNotFound()
+
+    if request.if_match is not None and etag_matches(request.if_match, md5, weak=False) is None:
+        return web.Response(status=412, headers=headers)
+    matched = etag_matches(request.if_none_match, md5)
+    if matched is not None:
+        headers['ETag'] = f'"{md5}"' if matched == '*' else f'"{matched}"'
+        return web.Response(status=304, headers=headers)
+    # ETag 形式的 If-Range 只认强 ETag；不命中时 (客户端缓存的是旧内容) 忽略 Range，返回完整内容
+    if_range = request.headers.get('If-Range', '')
+    range_allowed = (not if_range.startswith(('"', 'W/'))
+                     or (if_range.startswith('"') and if_range.strip('"').split('-', 1)[0] == md5))
+    response = ContentFileResponse(path, range_allowed=range_allowed, headers=headers)
+    response['md5'] = md5
+    return response
+
+
+async def serve_paper(request):
+    return await serve_static(request, PAPERS_DIR)
+
+
+async def serve_frontend(request):
+    return await serve_static(request, FRONTEND_DIR)
+
+
+async def apply_content_etag(request, response):
+    """FileResponse 默认以 mtime-size 作 ETag，发送前替换为索引中的内容 md5"""
+    if isinstance(response, web.FileResponse) and response.get('md5') and response.status in (200, 206):
+        encoding = response.headers.get('Content-Encoding')
+        response.etag = f"{response['md5']}-{encoding}" if encoding else response['md5']
+
+
 async def clear_state(request):
     """清除爬虫状态"""
-    state_file = os.path.join(BASE_DIR, 'scraper_state.json')
+    state_file = STATE_FILE
+    journal_file = STATE_JOURNAL
     
+    if os.path.exists(journal_file):
+        # 未压缩的增量日志一并备份，否则下次启动会被重放回来
+        os.replace(journal_file, journal_file + '.bak')
+
     if os.path.exists(state_file):
         # 备份后删除
         backup = state_file + '.bak'
-        os.rename(state_file, backup)
+        os.replace(state_file, backup)
         log(f"状态已清除，备份保存到: {backup}")
         return web.json_response({
             'status': 'ok',
@@ -334,35 +1099,70 @@ async def clear_state(request):
 
 # ============ 应用启动 ============
 
-def create_app():
+async def close_streams(app):
+    for task in list(sse_tasks):
+        task.cancel()
+
+
+def create_app(api: bool = True):
     app = web.Application(middlewares=[cors_middleware])
-    
-    # 注册路由
+    app.on_shutdown.append(close_streams)
+    app.on_response_prepare.append(apply_content_etag)
+
+    if api:
+        add_api_routes(app)
+    # 静态文件放在最后注册，/api 路由优先匹配
+    app.router.add_get('/papers/{path:.*}', serve_paper)
+    app.router.add_get('/{path:.*}', serve_frontend)
+    return app
+
+
+def add_api_routes(app):
     app.router.add_get('/api/status', get_status)
     app.router.add_get('/api/subjects', get_subjects)
     app.router.add_get('/api/log', get_log)
+    app.router.add_get('/api/log/stream', stream_log)
+    app.router.add_get('/api/events', stream_events)
+    app.router.add_get('/api/zip', download_zip)
     app.router.add_post('/api/scraper/start', run_scraper)
     app.router.add_post('/api/indexer/start', run_indexer)
     app.router.add_post('/api/process/stop', stop_process)
     app.router.add_post('/api/state/clear', clear_state)
-    
-    return app
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="DSE Library 管理后端服务")
+    parser.add_argument('--host', default=HOST, help=f"监听地址 (默认 {HOST}，局域网访问用 0.0.0.0)")
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--static-only', action='store_true',
+                        help="只提供 frontend/ 与 papers/ 静态文件，不注册管理 API (对局域网开放时使用)")
+    return parser.parse_args()
 
 
 if __name__ == '__main__':
+    args = parse_args()
     print("=" * 50)
     print("DSE Library 管理后端服务")
-    print(f"地址: http://{HOST}:{PORT}")
+    print(f"地址: http://{args.host}:{args.port}")
     print("=" * 50)
-    print("\nAPI 列表:")
-    print("  GET  /api/status      - 获取状态")
-    print("  GET  /api/subjects    - 获取科目列表")
-    print("  GET  /api/log         - 获取日志")
-    print("  POST /api/scraper/start - 启动爬虫")
-    print("  POST /api/indexer/start - 启动索引器")
-    print("  POST /api/process/stop  - 停止进程")
-    print("  POST /api/state/clear   - 清除状态")
+    print("\n静态文件:")
+    print("  GET  /              - 前端 (frontend/)")
+    print("  GET  /papers/...    - 试卷文件 (支持 Range / ETag)")
+    if args.static_only:
+        print("\n仅静态文件模式，管理 API 未启用")
+    else:
+        print("\nAPI 列表:")
+        print("  GET  /api/status      - 获取状态")
+        print("  GET  /api/subjects    - 获取科目列表")
+        print("  GET  /api/log         - 获取日志 (?since= 增量)")
+        print("  GET  /api/log/stream  - 实时日志 (SSE)")
+        print("  GET  /api/events      - 进程实时进度/输出 (SSE)")
+        print("  GET  /api/zip         - 打包下载 (?subject=&exam=&lang=&year=)")
+        print("  POST /api/scraper/start - 启动爬虫")
+        print("  POST /api/indexer/start - 启动索引器")
+        print("  POST /api/process/stop  - 停止进程")
+        print("  POST /api/state/clear   - 清除状态")
     print("\n按 Ctrl+C 停止服务\n")
     
-    app = create_app()
-    web.run_app(app, host=HOST, port=PORT, print=None)
+    app = create_app(api=not args.static_only)
+    web.run_app(app, host=args.host, port=args.port, print=None)
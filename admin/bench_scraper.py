@@ -0,0 +1,137 @@
+"""爬虫吞吐基准
+在临时目录中对本地模拟源站 (stub_origin.py) 运行 Scraper，比较:
+- pool : 当前的常驻 worker 池 + 有界队列
+- batch: 旧版每 BATCH_SIZE 个 URL 一次 gather，整批结束才开始下一批
+- serial: worker 池，但科目逐个爬取 (对照多科目并发)
+
+部分文件设置为慢文件 (--slow-ratio / --slow-delay)，用于体现整批等待最慢请求的代价。
+--capacity / --error-ratio 让模拟源站限流 (429 + Retry-After) 或随机 503，
+用于检验自适应并发：应收敛到源站容量附近，且重试后下载数与不限流时一致。
+
+用法:
+    python bench_scraper.py --subjects phy chem --slow-ratio 0.2 --slow-delay 1.0
+    python bench_scraper.py --modes pool --capacity 12 --error-ratio 0.02
+"""
+
+import io
+import time
+import asyncio
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+import scraper
+import blob_store
+from stub_origin import StubOrigin
+
+BATCH_SIZE = 50  # 旧版批量大小
+
+
+class BatchScraper(scraper.Scraper):
+    """旧版分批 gather 实现，仅作基准对照"""
+
+    async def probe_files(self, subject_key: str, files: List[Dict], referer: str) -> Set[Tuple[str, str, str]]:
+        hit_groups: Set[Tuple[str, str, str]] = set()
+
+        async def probe(f: Dict):
+            fresh = f['url'] not in self.state.seen_urls
+            hit = await self.download_file(f, referer)
+            if hit:
+                hit_groups.add(scraper.ProbeScheduler.group_key(f))
+            if fresh and f.get('is_probe'):
+                self.scheduler.record(f, hit)
+
+        for i in range(0, len(files), BATCH_SIZE):
+            await asyncio.gather(*(probe(f) for f in files[i:i + BATCH_SIZE]))
+            self.state.save()
+        return hit_groups
+
+
+def point_scraper_at(workdir: Path, base_url: str):
+    """把 scraper 的源站与所有落盘路径指向临时目录"""
+    scraper.BASE_URL = base_url
+    scraper.FILE_BASE_URL = f"{base_url}/files/"
+    scraper.DOWNLOAD_DIR = workdir / "downloads"
+    blob_store.OBJECTS_STORE = workdir / ".objects"
+    scraper.STATE_FILE = workdir / "scraper_state.json"
+    scraper.STATE_JOURNAL = workdir / "scraper_state.journal"
+    scraper.LOG_FILE = workdir / "scraper.log"
+    scraper.PROBE_STATS_FILE = workdir / "probe_stats.json"
+
+
+async def bench_once(mode: str, args) -> Dict:
+    origin = StubOrigin(latency=args.latency, exist_ratio=args.exist_ratio, file_size=args.file_size,
+                        slow_ratio=args.slow_ratio, slow_delay=args.slow_delay,
+                        capacity=args.capacity, retry_after=args.retry_after, error_ratio=args.error_ratio)
+    base_url = await origin.start()
+    try:
+        with tempfile.TemporaryDirectory(prefix=f"bench_{mode}_") as tmp:
+            point_scraper_at(Path(tmp), base_url)
+            cls = BatchScraper if mode == 'batch' else scraper.Scraper
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                async with cls(exhaustive=args.exhaustive) as s:
+                    if mode == 'serial':
+                        for subject_key in args.subjects:
+                            await s.run([subject_key])
+                    else:
+                        await s.run(args.subjects)
+                    downloaded = len(s.state.downloaded_files)
+                    failed = len(s.state.failed_urls)
+                    limiter, retries = s.limiter, s.retry_count
+            elapsed = time.perf_counter() - started
+    finally:
+        await origin.stop()
+    return {
+        'mode': mode,
+        'seconds': elapsed,
+        'requests': origin.requests,
+        'downloaded': downloaded,
+        'failed': failed,
+        'throttled': origin.throttled,
+        'errors': origin.errors,
+        'origin_peak': origin.peak_in_flight,
+        'limit': limiter.limit,
+        'peak_limit': limiter.peak_limit,
+        'retries': retries,
+        'req_per_s': origin.requests / elapsed,
+        'mb_per_s': origin.bytes_sent / 1024 / 1024 / elapsed,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="爬虫吞吐基准 (本地模拟源站)")
+    parser.add_argument('--subjects', nargs='+', default=['phy'])
+    parser.add_argument('--modes', nargs='+', choices=['pool', 'batch', 'serial'], default=['batch', 'pool'])
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--exist-ratio', type=float, default=0.1)
+    parser.add_argument('--file-size', type=int, default=64 * 1024)
+    parser.add_argument('--slow-ratio', type=float, default=0.2)
+    parser.add_argument('--slow-delay', type=float, default=1.0)
+    parser.add_argument('--capacity', type=int, default=0, help="源站同时处理上限，超出返回 429 (0 不限)")
+    parser.add_argument('--retry-after', type=float, default=1.0)
+    parser.add_argument('--error-ratio', type=float, default=0.0, help="源站随机 503 比例")
+    parser.add_argument('--exhaustive', action='store_true', help="使用全量探测 (请求数更多，差异更明显)")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    print(f"科目: {' '.join(args.subjects)}  延迟: {args.latency}s  慢文件: {args.slow_ratio:.0%} × {args.slow_delay}s")
+    results = [await bench_once(mode, args) for mode in args.modes]
+    print(f"{'模式':<8}{'耗时(s)':>10}{'请求数':>10}{'下载数':>10}{'请求/s':>10}{'MB/s':>10}")
+    for r in results:
+        print(f"{r['mode']:<8}{r['seconds']:>10.2f}{r['requests']:>10}{r['downloaded']:>10}{r['req_per_s']:>10.1f}{r['mb_per_s']:>10.2f}")
+        print(f"{'':<8}429: {r['throttled']}  503: {r['errors']}  重试: {r['retries']}  失败记录: {r['failed']}  "
+              f"并发: 结束 {r['limit']:.1f} / 峰值 {r['peak_limit']:.1f}  源站峰值在途: {r['origin_peak']}")
+    by_mode = {r['mode']: r for r in results}
+    if 'pool' in by_mode and 'batch' in by_mode:
+        print(f"pool 相对 batch 提速: {by_mode['batch']['seconds'] / by_mode['pool']['seconds']:.2f}x")
+    if 'pool' in by_mode and 'serial' in by_mode:
+        print(f"多科目并发相对逐科爬取提速: {by_mode['serial']['seconds'] / by_mode['pool']['seconds']:.2f}x")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,260 @@
+"""静态文件服务负载基准
+在临时目录生成试卷树并运行索引器 (--compact --bundles)，在子进程中启动管理后端，
+用大量并发客户端按比例混合请求:
+- full  : 完整下载一份试卷
+- range : 64 KB 的 Range 请求 (PDF.js 分段加载 / mp3 拖动)
+- cond  : 带 If-None-Match 的重新验证 (应返回 304)
+- json  : Accept-Encoding: gzip 读取科目分片 (预压缩变体)
+
+报告吞吐 (req/s, MB/s)、各类请求的延迟分位数、服务进程 CPU 时间与峰值内存。
+--no-sendfile 关闭零拷贝 (AIOHTTP_NOSENDFILE=1) 作对照。
+
+用法:
+    python bench_static.py --clients 200 --duration 10
+    python bench_static.py --clients 200 --duration 10 --no-sendfile
+"""
+
+import os
+import sys
+import time
+import json
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+from pathlib import Path
+
+import aiohttp
+
+from bench_zip import free_port, peak_rss_mb, wait_for_port
+
+BASE_DIR = Path(__file__).resolve().parent
+RANGE_BYTES = 64 * 1024
+MIX = {'full': 0.3, 'range': 0.4, 'cond': 0.2, 'json': 0.1}
+
+BUILD_CODE = """
+import sys
+sys.path.insert(0, {base!r})
+from pathlib import Path
+import indexer
+root = Path({root!r})
+indexer.REPO_ROOT = root
+indexer.ROOT_DIR = root / 'papers'
+indexer.OUTPUT_DIR = root / 'frontend' / 'public' / 'data'
+indexer.BUNDLES_DIR = root / 'frontend' / 'public' / 'bundles'
+indexer.CACHE_FILE = root / 'index_cache.json'
+indexer.generate_index(compact=True, bundles=True)
+"""
+
+SERVER_CODE = """
+import sys
+sys.path.insert(0, {base!r})
+import admin_server
+from aiohttp import web
+admin_server.PAPERS_DIR = {root!r} + '/papers'
+admin_server.FRONTEND_DIR = {root!r} + '/frontend'
+admin_server.DATA_DIR = {root!r} + '/frontend/public/data'
+web.run_app(admin_server.create_app(api=False), host='127.0.0.1', port={port}, print=None)
+"""
+
+
+def make_tree(root: Path, files: int, file_kb: int):
+    """生成 {subject}/dse/{lang}/{year}/{name} 试卷树，文件大小在 file_kb 的 0.5~1.5 倍之间"""
+    rng = random.Random(0)
+    names = ['p1.pdf', 'p2.pdf', 'ans.pdf', 'aud.mp3']
+    for i in range(files):
+        subject = ('phy', 'chem', 'bio', 'econ')[i % 4]
+        lang = ('eng', 'chi')[(i // 4) % 2]
+        year = str(2012 + (i // 8) % 12)
+        slot = i // 96
+        name = names[slot] if slot < len(names) else f"extra{slot}.pdf"
+        path = root / 'papers' / subject / 'dse' / lang / year / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(rng.randbytes(int(file_kb * 1024 * rng.uniform(0.5, 1.5))))
+    (root / 'frontend').mkdir(exist_ok=True)
+    (root / 'frontend' / 'index.html').write_text('<!doctype html>', encoding='utf-8')
+
+
+def load_targets(root: Path) -> dict:
+    """从生成的分片中读取试卷 URL 与 md5、分片 URL"""
+    data_dir = root / 'frontend' / 'public' / 'data'
+    with open(data_dir / 'index.json', encoding='utf-8') as f:
+        index = json.load(f)
+    papers = []
+    shards = []
+    for subject in index['subjects']:
+        shards.append(f"/public/data/{subject['shard']['path']}")
+        with open(data_dir / subject['shard']['path'], encoding='utf-8') as f:
+            shard = json.load(f)
+        for exam in shard['exams'].values():
+            for year in exam['years'].values():
+                for lang in year['languages'].values():
+                    for file in lang['files']:
+                        url = '/' + os.path.relpath(root / 'frontend' / file['path'], root).replace(os.sep, '/')
+                        papers.append((url, file['md5'], file['size']))
+    return {'papers': papers, 'shards': shards}
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def client_loop(session, base: str, targets: dict, deadline: float, rng: random.Random, stats: dict):
+    kinds = list(MIX)
+    weights = [MIX[k] for k in kinds]
+    while time.monotonic() < deadline:
+        kind = rng.choices(kinds, weights)[0]
+        headers = {}
+        if kind == 'json':
+            url = rng.choice(targets['shards'])
+            headers['Accept-Encoding'] = 'gzip'
+        else:
+            url, md5, size = rng.choice(targets['papers'])
+            if kind == 'range':
+                start = rng.randrange(max(size - RANGE_BYTES, 1))
+                headers['Range'] = f"bytes={start}-{start + RANGE_BYTES - 1}"
+            elif kind == 'cond':
+                headers['If-None-Match'] = f'"{md5}"'
+        started = time.perf_counter()
+        try:
+            async with session.get(base + url, headers=headers, auto_decompress=False) as response:
+                body = await response.read()
+                expected = {'full': 200, 'range': 206, 'cond': 304, 'json': 200}[kind]
+                ok = response.status == expected
+        except aiohttp.ClientError:
+            ok = False
+            body = b''
+        elapsed = (time.perf_counter() - started) * 1000
+        entry = stats[kind]
+        entry['latencies'].append(elapsed)
+        entry['bytes'] += len(body)
+        entry['errors'] += not ok
+
+
+async def run_clients(base: str, targets: dict, clients: int, duration: float, seed: int) -> dict:
+    stats = {kind: {'latencies': [], 'bytes': 0, 'errors': 0} for kind in MIX}
+    connector = aiohttp.TCPConnector(limit=clients)
+    deadline = time.monotonic() + duration
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*(
+            client_loop(session, base, targets, deadline, random.Random(seed * 100003 + i), stats)
+            for i in range(clients)
+        ))
+    return stats
+
+
+def client_process(args: tuple) -> dict:
+    return asyncio.run(run_clients(*args))
+
+
+def cpu_seconds(pid: int):
+    """进程累计 CPU 时间 (utime + stime)，仅 Linux"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="静态文件服务负载基准")
+    parser.add_argument('--files', type=int, default=400, help="生成的试卷数量")
+    parser.add_argument('--file-kb', type=int, default=512, help="平均文件大小 (KB)")
+    parser.add_argument('--clients', type=int, default=200, help="并发客户端总数")
+    parser.add_argument('--procs', type=int, default=1, help="客户端进程数 (客户端分摊到多个进程，避免压测端成为瓶颈)")
+    parser.add_argument('--duration', type=float, default=10.0, help="压测时长 (秒)")
+    parser.add_argument('--no-sendfile', action='store_true', help="关闭零拷贝发送作对照")
+    parser.add_argument('--output', help="结果写入 JSON 文件")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix='bench_static_') as tmp:
+        root = Path(tmp)
+        make_tree(root, args.files, args.file_kb)
+        subprocess.run([sys.executable, '-c', BUILD_CODE.format(base=str(BASE_DIR), root=str(root))],
+                       check=True, stdout=subprocess.DEVNULL)
+        targets = load_targets(root)
+
+        port = free_port()
+        env = dict(os.environ)
+        if args.no_sendfile:
+            env['AIOHTTP_NOSENDFILE'] = '1'
+        server = subprocess.Popen([sys.executable, '-c', SERVER_CODE.format(base=str(BASE_DIR), root=str(root), port=port)],
+                                  env=env)
+        try:
+            asyncio.run(wait_for_port(port))
+            cpu_before = cpu_seconds(server.pid)
+            base = f'http://127.0.0.1:{port}'
+            procs = max(args.procs, 1)
+            jobs = [(base, targets, args.clients // procs + (i < args.clients % procs), args.duration, i)
+                    for i in range(procs)]
+            started = time.perf_counter()
+            if procs == 1:
+                results = [client_process(jobs[0])]
+            else:
+                with multiprocessing.Pool(procs) as pool:
+                    results = pool.map(client_process, jobs)
+            elapsed = time.perf_counter() - started
+            cpu_after = cpu_seconds(server.pid)
+            peak = peak_rss_mb(server.pid)
+        finally:
+            server.terminate()
+            server.wait()
+
+    by_kind = {}
+    total_requests = total_bytes = total_errors = 0
+    for kind in MIX:
+        latencies = [v for r in results for v in r[kind]['latencies']]
+        nbytes = sum(r[kind]['bytes'] for r in results)
+        errors = sum(r[kind]['errors'] for r in results)
+        by_kind[kind] = {
+            'requests': len(latencies),
+            'errors': errors,
+            'mb': round(nbytes / 1024 ** 2, 1),
+            'p50_ms': round(percentile(latencies, 0.50), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+        }
+        total_requests += len(latencies)
+        total_bytes += nbytes
+        total_errors += errors
+
+    server_cpu = cpu_after - cpu_before if cpu_before is not None and cpu_after is not None else None
+    result = {
+        'sendfile': not args.no_sendfile,
+        'files': args.files,
+        'clients': args.clients,
+        'duration_s': round(elapsed, 2),
+        'requests': total_requests,
+        'errors': total_errors,
+        'req_per_s': round(total_requests / elapsed, 1),
+        'mb_per_s': round(total_bytes / 1024 ** 2 / elapsed, 1),
+        'server_cpu_s': round(server_cpu, 2) if server_cpu is not None else None,
+        'server_peak_rss_mb': round(peak, 1) if peak is not None else None,
+        'by_kind': by_kind,
+    }
+
+    print(f"模式: {'sendfile' if result['sendfile'] else '普通读写'}, {args.clients} 个并发客户端, {elapsed:.1f}s")
+    print(f"吞吐: {result['req_per_s']} req/s, {result['mb_per_s']} MB/s, 错误 {total_errors}")
+    for kind, info in by_kind.items():
+        print(f"  {kind:<6} {info['requests']:>7} 次  p50 {info['p50_ms']:>7.2f} ms  "
+              f"p95 {info['p95_ms']:>7.2f} ms  p99 {info['p99_ms']:>7.2f} ms  错误 {info['errors']}")
+    if server_cpu is not None:
+        print(f"服务进程 CPU: {server_cpu:.2f}s ({server_cpu / max(total_bytes / 1024 ** 3, 1e-9):.2f} s/GB)")
+    if peak is not None:
+        print(f"服务进程峰值内存: {peak:.1f} MB")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
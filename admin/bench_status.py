@@ -0,0 +1,87 @@
+"""/api/status 状态汇总基准
+在临时目录生成 seen_urls 规模不同的 scraper_state.json，比较:
+- cold : 新建 StateCache 首次读取 (等同旧实现每次请求的开销：完整解析 + 三次扫描)
+- warm : 状态未变化时的重复请求
+- incr : 每次请求前向 journal 追加 100 条记录
+并校验增量维护的汇总与从头加载的结果一致。
+
+用法:
+    python bench_status.py --sizes 10000 100000 300000
+"""
+
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+import admin_server
+
+SUBJECT_KEYS = ['chi', 'eng', 'm0', 'phy', 'chem', 'bio', 'econ', 'ict']
+
+
+def make_url(i: int) -> str:
+    return f"{admin_server.FILE_URL_PREFIX}{SUBJECT_KEYS[i % len(SUBJECT_KEYS)]}/eng/{1980 + i % 45}/f{i}.pdf"
+
+
+def write_snapshot(path: Path, n: int, rng: random.Random):
+    urls = [make_url(i) for i in range(n)]
+    downloaded = [u for u in urls if rng.random() < 0.1]
+    failed = {u: '404' for u in urls if rng.random() < 0.8}
+    progress = {k: {'total_urls': n // len(SUBJECT_KEYS), 'completed': False} for k in SUBJECT_KEYS}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'downloaded_files': downloaded, 'failed_urls': failed, 'seen_urls': urls,
+                   'progress': progress}, f)
+
+
+def append_journal(path: Path, start: int, count: int, rng: random.Random):
+    with open(path, 'a', encoding='utf-8') as f:
+        for i in range(start, start + count):
+            f.write(json.dumps({'u': make_url(i), 'r': 'ok' if rng.random() < 0.2 else '404'}) + '\n')
+
+
+def timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000
+
+
+def bench_size(n: int, rounds: int) -> dict:
+    rng = random.Random(n)
+    with tempfile.TemporaryDirectory(prefix='bench_status_') as tmp:
+        admin_server.STATE_FILE = str(Path(tmp) / 'scraper_state.json')
+        admin_server.STATE_JOURNAL = str(Path(tmp) / 'scraper_state.journal')
+        write_snapshot(Path(admin_server.STATE_FILE), n, rng)
+
+        cache = admin_server.StateCache()
+        cold = timed(cache.status)
+        warm = statistics.median(timed(cache.status) for _ in range(rounds))
+        incr = []
+        for r in range(rounds):
+            append_journal(Path(admin_server.STATE_JOURNAL), n + r * 100, 100, rng)
+            incr.append(timed(cache.status))
+
+        expected = admin_server.StateCache().status()['state']['summary']
+        assert cache.status()['state']['summary'] == expected, "增量汇总与完整加载结果不一致"
+    return {'seen': n, 'cold_ms': cold, 'warm_ms': warm, 'incr_ms': statistics.median(incr)}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="/api/status 状态汇总基准")
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000, 300000])
+    parser.add_argument('--rounds', type=int, default=20)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print(f"{'seen_urls':>10}{'cold(ms)':>12}{'warm(ms)':>12}{'incr(ms)':>12}")
+    for n in args.sizes:
+        r = bench_size(n, args.rounds)
+        print(f"{r['seen']:>10}{r['cold_ms']:>12.1f}{r['warm_ms']:>12.3f}{r['incr_ms']:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
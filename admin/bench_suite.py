@@ -0,0 +1,354 @@
+"""性能基准套件
+对三个组件做可复现的基准，每个组件在独立子进程中运行 (峰值内存互不干扰):
+- indexer: 在合成的 papers/ 树上运行 generate_index，冷启动 (无指纹缓存) 一次 + 热启动 --repeat 次
+- scraper: 对本地模拟源站 (stub_origin.py，可配置延迟 / 404 比例 / 限流) 运行 Scraper.scrape_subject；
+           计时前先跑 check_resume.run_checks()，断点续传有回归时该组件直接失败
+- status : 合成 seen_urls 规模的爬虫状态，测 StateCache 冷加载、summarize_progress 与 /api/status 汇总
+
+报告吞吐、延迟分位数与峰值内存 (ru_maxrss)，结果连同运行环境写入 JSON；
+--compare 与之前的结果对比，超出 --tolerance 的退化会被列出并以退出码 1 结束。
+
+用法:
+    python bench_suite.py                                     # 全部组件，写入 bench_results/<时间>.json
+    python bench_suite.py --components indexer --files 5000 --file-kb 64
+    python bench_suite.py --compare bench_results/baseline.json --tolerance 0.15
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import platform
+import argparse
+import tempfile
+import statistics
+import contextlib
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块，峰值内存记为不可用
+    resource = None
+
+BASE_DIR = Path(__file__).resolve().parent
+RESULTS_DIR = BASE_DIR / "bench_results"
+COMPONENTS = ('indexer', 'scraper', 'status')
+RESULT_MARKER = 'BENCH_RESULT '
+YEARS = [str(y) for y in range(2012, 2025)]
+LANGS = ['eng', 'chi']
+
+
+# ============ 合成数据 ============
+
+def make_papers(root: Path, files: int, file_bytes: int, seed: int = 0) -> Dict:
+    """生成 {subject}/dse/{lang}/{year}/{name} 试卷树
+
+    文件按 科目 × 语言 × 年份 轮流分布，文件名取自 indexer.FILE_TYPES (不够时追加 extraN.pdf)；
+    内容为固定种子的随机字节，大小在 file_bytes 的 0.5~1.5 倍之间，同参数生成的树完全相同。
+    """
+    import indexer
+
+    rng = random.Random(seed)
+    dirs = [(s, lang, year) for s in indexer.SUBJECTS for lang in LANGS for year in YEARS]
+    names = list(indexer.FILE_TYPES)
+    total = 0
+    for i in range(files):
+        subject, lang, year = dirs[i % len(dirs)]
+        slot = i // len(dirs)
+        name = names[slot] if slot < len(names) else f"extra{slot}.pdf"
+        path = root / subject / 'dse' / lang / year / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        size = int(file_bytes * rng.uniform(0.5, 1.5))
+        path.write_bytes(rng.randbytes(size))
+        total += size
+    return {'files': files, 'bytes': total}
+
+
+# ============ 统计 ============
+
+def percentiles(values: List[float], prefix: str, unit: str = 'ms') -> Dict:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pick(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+    return {
+        f'{prefix}_p50_{unit}': round(pick(0.50), 3),
+        f'{prefix}_p95_{unit}': round(pick(0.95), 3),
+        f'{prefix}_p99_{unit}': round(pick(0.99), 3),
+        f'{prefix}_max_{unit}': round(ordered[-1], 3),
+    }
+
+
+def peak_rss_mb() -> Optional[float]:
+    """当前进程峰值常驻内存 (Linux 上 ru_maxrss 单位为 KB，macOS 为字节)；Windows 上返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 ** 2 if sys.platform == 'darwin' else 1024), 1)
+
+
+# ============ 组件基准 (在子进程中运行) ============
+
+def bench_indexer(args, workdir: Path) -> Dict:
+    import indexer
+
+    started = time.perf_counter()
+    tree = make_papers(workdir / 'papers', args.files, args.file_kb * 1024, args.seed)
+    generate_s = time.perf_counter() - started
+
+    indexer.REPO_ROOT = workdir
+    indexer.ROOT_DIR = workdir / 'papers'
+    indexer.OUTPUT_DIR = workdir / 'frontend' / 'public' / 'data'
+    indexer.BUNDLES_DIR = workdir / 'frontend' / 'public' / 'bundles'
+    indexer.CACHE_FILE = workdir / 'index_cache.json'
+    indexer.META_CACHE_FILE = workdir / 'meta_cache.json'
+
+    def run() -> float:
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            indexer.generate_index(jobs=args.jobs, compact=True, columnar=True)
+        return time.perf_counter() - started
+
+    cold = run()
+    warm = [run() * 1000 for _ in range(args.repeat)]
+    mb = tree['bytes'] / 1024 ** 2
+    return {
+        'files': tree['files'],
+        'mb': round(mb, 1),
+        'generate_s': round(generate_s, 3),
+        'cold_s': round(cold, 3),
+        'cold_files_per_s': round(tree['files'] / cold, 1),
+        'cold_mb_per_s': round(mb / cold, 1),
+        'warm_files_per_s': round(tree['files'] / (statistics.median(warm) / 1000), 1),
+        **percentiles(warm, 'warm_run'),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def bench_scraper(args, workdir: Path) -> Dict:
+    import scraper
+    from stub_origin import StubOrigin
+    from bench_scraper import point_scraper_at
+    from check_resume import run_checks
+
+    class RecordingLimiter(scraper.AdaptiveLimiter):
+        """记录每个成功响应的首字节延迟"""
+
+        def __init__(self):
+            super().__init__()
+            self.samples: List[float] = []
+
+        def on_success(self, latency: float):
+            self.samples.append(latency * 1000)
+            super().on_success(latency)
+
+    async def run() -> Dict:
+        failures = await run_checks()
+        if failures:
+            raise AssertionError("断点续传回归测试未通过:\n" + '\n'.join(failures))
+        origin = StubOrigin(latency=args.origin_latency, exist_ratio=1 - args.origin_404_ratio,
+                            file_size=args.origin_file_kb * 1024, capacity=args.origin_capacity,
+                            error_ratio=args.origin_error_ratio, seed=args.seed)
+        base_url = await origin.start()
+        try:
+            point_scraper_at(workdir, base_url)
+            with contextlib.redirect_stdout(io.StringIO()):
+                async with scraper.Scraper(exhaustive=args.exhaustive) as s:
+                    s.limiter = RecordingLimiter()
+                    started = time.perf_counter()
+                    await asyncio.gather(*(s.scrape_subject(k, scraper.SUBJECTS[k]) for k in args.subjects))
+                    elapsed = time.perf_counter() - started
+                    downloaded = len(s.state.downloaded_files)
+                    limiter, retries = s.limiter, s.retry_count
+        finally:
+            await origin.stop()
+        return {
+            'subjects': len(args.subjects),
+            'elapsed_s': round(elapsed, 3),
+            'requests': origin.requests,
+            'downloaded': downloaded,
+            'throttled': origin.throttled,
+            'retries': retries,
+            'req_per_s': round(origin.requests / elapsed, 1),
+            'mb_per_s': round(origin.bytes_sent / 1024 ** 2 / elapsed, 2),
+            'peak_limit': round(limiter.peak_limit, 1),
+            **percentiles(limiter.samples, 'request'),
+        }
+
+    result = asyncio.run(run())
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+
+def bench_status(args, workdir: Path) -> Dict:
+    import admin_server
+    from bench_status import append_journal, write_snapshot
+
+    rng = random.Random(args.seed)
+    admin_server.STATE_FILE = str(workdir / 'scraper_state.json')
+    admin_server.STATE_JOURNAL = str(workdir / 'scraper_state.journal')
+    write_snapshot(Path(admin_server.STATE_FILE), args.seen, rng)
+
+    cache = admin_server.StateCache()
+    started = time.perf_counter()
+    cache.status()
+    cold_ms = (time.perf_counter() - started) * 1000
+
+    def timed(fn, rounds: int) -> List[float]:
+        samples = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - started) * 1000)
+        return samples
+
+    summarize = timed(lambda: admin_server.summarize_progress(cache.progress, cache.per_subject), args.rounds)
+    warm = timed(cache.status, args.rounds)
+    incr = []
+    for r in range(args.rounds):
+        append_journal(Path(admin_server.STATE_JOURNAL), args.seen + r * 100, 100, rng)
+        incr += timed(cache.status, 1)
+    return {
+        'seen': args.seen,
+        'cold_load_ms': round(cold_ms, 1),
+        'summarize_per_s': round(len(summarize) / (sum(summarize) / 1000), 1),
+        **percentiles(summarize, 'summarize'),
+        **percentiles(warm, 'status_warm'),
+        **percentiles(incr, 'status_incr'),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+BENCHES = {'indexer': bench_indexer, 'scraper': bench_scraper, 'status': bench_status}
+
+
+# ============ 调度与对比 ============
+
+def run_component(name: str, argv: List[str]) -> Dict:
+    """在子进程中运行单个组件，解析其输出的结果行"""
+    proc = subprocess.run([sys.executable, __file__, '--component', name, *argv],
+                          cwd=BASE_DIR, capture_output=True, text=True)
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    raise RuntimeError(f"{name} 基准失败:\n{proc.stderr[-2000:]}")
+
+
+def environment() -> Dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith('_per_s')
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """返回超出容差的退化项；只比较吞吐 (_per_s)、耗时 (_ms / _s) 与内存 (_mb) 指标
+
+    单次最大值 (_max_) 受偶发抖动影响大，只显示不计入退化。
+    """
+    regressions = []
+    for component, metrics in current['results'].items():
+        old_metrics = baseline.get('results', {}).get(component, {})
+        for metric, value in metrics.items():
+            old = old_metrics.get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            if not metric.endswith(('_per_s', '_ms', '_s', '_mb')):
+                continue
+            change = (value - old) / old
+            worse = -change if higher_is_better(metric) else change
+            flag = '退化' if worse > tolerance else ('改善' if worse < -tolerance else '')
+            print(f"  {component:<8}{metric:<28}{old:>12}{value:>12}{change:>+9.1%}  {flag}")
+            if flag == '退化' and '_max_' not in metric:
+                regressions.append(f"{component}.{metric}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="DSE Library 性能基准套件")
+    parser.add_argument('--components', nargs='+', choices=COMPONENTS, default=list(COMPONENTS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help=f"结果 JSON 路径 (默认 {RESULTS_DIR.name}/<时间>.json)")
+    parser.add_argument('--compare', help="与之前的结果 JSON 对比")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="对比时允许的相对波动 (默认 0.10)")
+    group = parser.add_argument_group('indexer')
+    group.add_argument('--files', type=int, default=2000, help="合成试卷数量")
+    group.add_argument('--file-kb', type=int, default=64, help="平均文件大小 (KB)")
+    group.add_argument('--repeat', type=int, default=5, help="热启动 (指纹缓存命中) 运行次数")
+    group.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 4)
+    group = parser.add_argument_group('scraper')
+    group.add_argument('--subjects', nargs='+', default=['phy', 'chem'])
+    group.add_argument('--exhaustive', action='store_true', help="全量探测 (请求数更多)")
+    group.add_argument('--origin-latency', type=float, default=0.02, help="模拟源站响应延迟 (秒)")
+    group.add_argument('--origin-404-ratio', type=float, default=0.9, help="探测地址中不存在的比例")
+    group.add_argument('--origin-file-kb', type=int, default=64)
+    group.add_argument('--origin-capacity', type=int, default=0, help="源站同时处理上限，超出返回 429 (0 不限)")
+    group.add_argument('--origin-error-ratio', type=float, default=0.0, help="源站随机 503 比例")
+    group = parser.add_argument_group('status')
+    group.add_argument('--seen', type=int, default=100000, help="合成状态中的 seen_urls 数量")
+    group.add_argument('--rounds', type=int, default=200, help="每项计时的调用次数")
+    parser.add_argument('--component', choices=COMPONENTS, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main():
+    argv = sys.argv[1:]
+    args = parse_args(argv)
+
+    if args.component:
+        # 子进程模式：只运行一个组件，结果以一行 JSON 输出
+        with tempfile.TemporaryDirectory(prefix=f'bench_{args.component}_') as tmp:
+            result = BENCHES[args.component](args, Path(tmp))
+        print(RESULT_MARKER + json.dumps(result, ensure_ascii=False), flush=True)
+        return
+
+    report = {'environment': environment(), 'args': vars(args), 'results': {}}
+    report['args'].pop('component')
+    for name in args.components:
+        print(f"[{name}] 运行中...", flush=True)
+        result = run_component(name, argv)
+        report['results'][name] = result
+        for metric, value in result.items():
+            print(f"  {metric:<28}{'不可用' if value is None else value}")
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已写入: {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\n对比 {args.compare} (容差 {args.tolerance:.0%}):")
+        print(f"  {'组件':<6}{'指标':<26}{'基线':>12}{'本次':>12}{'变化':>9}")
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n退化 {len(regressions)} 项: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n未发现超出容差的退化")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""流式 ZIP 打包下载基准/校验
+在临时目录生成多 GB 的稀疏 PDF 文件 (不占实际磁盘)，在子进程中启动管理后端，
+通过 /api/zip 下载整个科目，然后:
+- 用 zipfile 校验归档 (文件列表、大小、逐个 CRC)
+- 读取服务进程的峰值内存 (/proc/<pid>/status 的 VmHWM，仅 Linux)，校验下载期间的增长
+  (峰值 - 启动后基线) 不超过 MEMORY_CHUNKS 个 CHUNK_SIZE 加 MEMORY_SLACK，即内存不随选择大小增长
+
+任一项校验失败时以退出码 1 结束。没有 /proc 的平台无法测量服务进程内存，
+默认以退出码 2 结束，--no-memory-check 时只做归档校验。
+
+用法:
+    python bench_zip.py --size-gb 5 --files 40
+"""
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import zipfile
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+import aiohttp
+
+from zipstream import CHUNK_SIZE
+
+BASE_DIR = Path(__file__).resolve().parent
+HEAD_BYTES = 1024 * 1024  # 每个文件开头写入的随机数据，其余部分为稀疏空洞
+# 下载期间服务进程允许的内存增长: 读取/发送缓冲若干块 + 首次请求的惰性初始化等固定开销
+MEMORY_CHUNKS = 4
+MEMORY_SLACK = 32 * 1024 * 1024
+
+SERVER_CODE = """
+import sys
+sys.path.insert(0, {base!r})
+import admin_server
+from aiohttp import web
+admin_server.PAPERS_DIR = {papers!r}
+web.run_app(admin_server.create_app(), host='127.0.0.1', port={port}, print=None)
+"""
+
+
+def make_papers(root: Path, size_gb: float, files: int) -> int:
+    """生成 phy/dse/{lang}/{year}/pN.pdf 稀疏文件，返回总字节数"""
+    per_file = int(size_gb * 1024 ** 3 / files)
+    total = 0
+    for i in range(files):
+        lang = ('eng', 'chi')[i % 2]
+        year = str(2012 + (i // 2) % 10)
+        path = root / 'phy' / 'dse' / lang / year / f"p{i // 20 + 1}_{i}.pdf"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(os.urandom(HEAD_BYTES))
+            f.truncate(per_file)
+        total += per_file
+    return total
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def peak_rss_mb(pid: int):
+    """进程峰值常驻内存 (MB)；没有 /proc 的平台返回 None"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+async def download(url: str, out: Path) -> tuple:
+    started = time.perf_counter()
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None)) as session:
+        async with session.get(url) as response:
+            response.raise_for_status()
+            declared = response.content_length
+            received = 0
+            with open(out, 'wb') as f:
+                async for chunk in response.content.iter_chunked(1024 * 1024):
+                    f.write(chunk)
+                    received += len(chunk)
+    return declared, received, time.perf_counter() - started
+
+
+async def wait_for_port(port: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("管理后端启动超时")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="流式 ZIP 打包下载基准")
+    parser.add_argument('--size-gb', type=float, default=5.0, help="选择的文件总大小 (GB)")
+    parser.add_argument('--files', type=int, default=40)
+    parser.add_argument('--max-growth-mb', type=float, default=(MEMORY_CHUNKS * CHUNK_SIZE + MEMORY_SLACK) / 1024 ** 2,
+                        help="下载期间服务进程峰值内存允许的增长 (MB，默认 %(default)g)")
+    parser.add_argument('--no-memory-check', action='store_true',
+                        help="没有 /proc 的平台上跳过内存校验，只校验归档")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix='bench_zip_') as tmp:
+        papers = Path(tmp) / 'papers'
+        total = make_papers(papers, args.size_gb, args.files)
+        port = free_port()
+        server = subprocess.Popen([sys.executable, '-c', SERVER_CODE.format(base=str(BASE_DIR), papers=str(papers), port=port)])
+        try:
+            await wait_for_port(port)
+            baseline = peak_rss_mb(server.pid)
+            out = Path(tmp) / 'out.zip'
+            declared, received, elapsed = await download(f'http://127.0.0.1:{port}/api/zip?subject=phy', out)
+            peak = peak_rss_mb(server.pid)
+        finally:
+            server.terminate()
+            server.wait()
+
+        print(f"选择: {args.files} 个文件, {total / 1024 ** 3:.2f} GB")
+        print(f"下载: {received / 1024 ** 3:.2f} GB, 耗时 {elapsed:.1f}s ({received / 1024 ** 2 / elapsed:.0f} MB/s)")
+        failures = []
+        if declared != received:
+            failures.append(f"Content-Length 不一致: 声明 {declared}, 实际 {received}")
+        with zipfile.ZipFile(out) as zf:
+            infos = zf.infolist()
+            if len(infos) != args.files:
+                failures.append(f"条目数不符: {len(infos)}")
+            if sum(i.file_size for i in infos) != total:
+                failures.append("文件总大小不符")
+            bad = zf.testzip()
+            if bad is not None:
+                failures.append(f"CRC 校验失败: {bad}")
+        if not failures:
+            print("归档校验通过 (Content-Length、条目数、大小、CRC)")
+
+    if peak is None or baseline is None:
+        print("[跳过] 本平台没有 /proc，无法测量服务进程峰值内存，未做内存校验", file=sys.stderr)
+    else:
+        growth = peak - baseline
+        print(f"服务进程峰值内存: {peak:.1f} MB (启动后 {baseline:.1f} MB, 增长 {growth:.1f} MB, "
+              f"上限 {args.max_growth_mb:g} MB)")
+        if growth > args.max_growth_mb:
+            failures.append(f"峰值内存增长 {growth:.1f} MB 超过上限 {args.max_growth_mb:g} MB")
+
+    if failures:
+        for failure in failures:
+            print(f"[失败] {failure}")
+        sys.exit(1)
+    if peak is None and not args.no_memory_check:
+        sys.exit(2)
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,54 @@
+"""内容寻址存储 (indexer.py 与 scraper.py 的 --dedup 共用)
+OBJECTS_STORE/{md5[:2]}/{md5}: 内容相同的文件硬链接到同一个 blob，只占一份磁盘空间。
+
+- 存储位于仓库根目录，不在 papers/、frontend/ 等部署目录内，静态上传不会把 blob 再传一份
+- 硬链接不能跨文件系统，存储须与试卷/下载目录在同一文件系统
+- 文件总是整体替换 (os.replace) 而不原地改写，共享同一 blob 的路径不会互相影响
+"""
+
+import os
+from pathlib import Path
+from typing import Optional
+
+OBJECTS_STORE = Path(__file__).resolve().parent.parent / ".objects"
+
+
+def link_into_store(path, md5: str, store: Optional[Path] = None) -> int:
+    """把文件收进存储，返回因去重省下的字节数
+
+    blob 不存在时把本文件登记为 blob (硬链接，不复制)，返回 0；已有相同内容的 blob 时，
+    用指向 blob 的硬链接替换本文件，返回文件大小。失败 (如文件系统不支持硬链接) 时
+    抛出 OSError，本文件保持原样。
+    """
+    blob = os.path.join(store or OBJECTS_STORE, md5[:2], md5)
+    st = os.stat(path)
+    try:
+        blob_st = os.stat(blob)
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        os.link(path, blob)
+        return 0
+    if (blob_st.st_dev, blob_st.st_ino) == (st.st_dev, st.st_ino) or blob_st.st_size != st.st_size:
+        return 0
+    tmp_path = f"{path}.link"
+    os.link(blob, tmp_path)
+    os.replace(tmp_path, path)
+    return st.st_size
+
+
+def prune_store(store: Optional[Path] = None) -> int:
+    """删除不再被任何路径引用的 blob (链接数为 1)，返回删除数量"""
+    store = store or OBJECTS_STORE
+    removed = 0
+    if not os.path.isdir(store):
+        return 0
+    with os.scandir(store) as buckets:
+        for bucket in buckets:
+            if not bucket.is_dir():
+                continue
+            with os.scandir(bucket.path) as it:
+                for entry in it:
+                    if entry.is_file() and entry.stat().st_nlink == 1:
+                        os.remove(entry.path)
+                        removed += 1
+    return removed
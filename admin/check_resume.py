@@ -0,0 +1,228 @@
+"""断点续传回归测试
+对本地模拟源站 (stub_origin.py) 下载一个多 MB 文件，源站在发出 cut 字节后断开连接，覆盖三条路径:
+- in_run     : 同一次运行内重试，带 Range: bytes=<.part 大小>- 与 If-Range (ETag)，源站只发送剩余字节 (206)
+- across_runs: 重试耗尽后进程被杀 (只留增量日志)，日志记为暂时性的 partial、不进 seen_urls，
+               .part / .part.json 记录了已下载字节、ETag 与总长度；下次运行重放日志后从 .part 续传
+- if_range   : 两次运行之间源站更新了文件，旧 ETag 的 If-Range 不再匹配，源站返回完整 200，
+               Scraper 应从头写入新内容，而不是拼接到旧前缀后面
+每条路径都校验最终 md5 与 .part / .part.json 已清理。
+断开时最后一个未写满的块 (scraper.DOWNLOAD_CHUNK_SIZE) 会丢失，.part 大小不超过 cut，cut 应取块大小的数倍。
+
+其它基准可直接调用 run_checks() (返回未通过的项，空列表表示全部通过)；
+作为脚本运行时任一项未通过即以退出码 1 结束。
+
+用法:
+    python check_resume.py --size-mb 8 --cut-mb 3
+"""
+
+import io
+import sys
+import json
+import asyncio
+import hashlib
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import scraper
+from stub_origin import StubOrigin
+from bench_scraper import point_scraper_at
+
+FILE_PATH = 'phy/eng/2012/p1.pdf'
+DEFAULT_SIZE = 8 * 1024 * 1024
+DEFAULT_CUT = 3 * 1024 * 1024
+
+
+def expect(condition: bool, message: str):
+    """不用 assert 语句，python -O 下同样生效"""
+    if not condition:
+        raise AssertionError(message)
+
+
+def file_info() -> Dict:
+    return {'url': f"{scraper.FILE_BASE_URL}{FILE_PATH}", 'subject': 'phy', 'exam_type': 'dse',
+            'lang': 'eng', 'year': '2012', 'filename': 'p1.pdf'}
+
+
+def save_path() -> Path:
+    return scraper.DOWNLOAD_DIR / 'phy' / 'dse' / 'eng' / '2012' / 'p1.pdf'
+
+
+def part_files() -> Tuple[Path, Path]:
+    part_path = save_path().with_name(save_path().name + '.part')
+    return part_path, part_path.with_name(part_path.name + '.json')
+
+
+def md5_of(data: bytes) -> str:
+    return hashlib.md5(data).hexdigest()
+
+
+@contextlib.asynccontextmanager
+async def stub_workdir(size: int, cut: int):
+    """启动模拟源站并把 scraper 的所有落盘路径指向一个临时目录"""
+    origin = StubOrigin(latency=0.0, exist_ratio=1.0, file_size=size, cut_after=cut)
+    base_url = await origin.start()
+    try:
+        with tempfile.TemporaryDirectory(prefix='check_resume_') as tmp:
+            point_scraper_at(Path(tmp), base_url)
+            yield origin, base_url
+    finally:
+        await origin.stop()
+
+
+@contextlib.contextmanager
+def retries(count: int):
+    saved = scraper.MAX_RETRIES
+    scraper.MAX_RETRIES = count
+    try:
+        yield
+    finally:
+        scraper.MAX_RETRIES = saved
+
+
+async def download_once(base_url: str, killed: bool = False) -> Tuple[bool, Dict]:
+    """运行一个 Scraper 下载测试文件，返回 (是否成功, 下载前从状态中加载到的该 URL 记录)
+
+    killed=True 模拟进程在退出压缩前被杀：删掉快照，只留下本次追加的增量日志。
+    """
+    url = file_info()['url']
+    journal_path = Path(scraper.STATE_JOURNAL)
+    with contextlib.redirect_stdout(io.StringIO()):
+        async with scraper.Scraper() as s:
+            loaded = {'seen': url in s.state.seen_urls, 'failed': s.state.failed_urls.get(url)}
+            ok = await s.download_file(file_info(), base_url)
+            s.state.save()
+            journal = journal_path.read_text(encoding='utf-8') if journal_path.exists() else ''
+    if killed:
+        Path(scraper.STATE_FILE).unlink()
+        journal_path.write_text(journal, encoding='utf-8')
+    return ok, loaded
+
+
+def expect_complete(expected: bytes):
+    final = save_path().read_bytes() if save_path().exists() else b''
+    expect(md5_of(final) == md5_of(expected), f"最终文件 md5 不符: {md5_of(final)}，应为 {md5_of(expected)}")
+    leftovers = [p.name for p in part_files() if p.exists()]
+    expect(not leftovers, f"残留续传文件: {leftovers}")
+
+
+def file_requests(origin: StubOrigin) -> List[Dict]:
+    return [r for r in origin.file_log if r['path'] == FILE_PATH]
+
+
+def part_offset(part_path: Path, cut: int) -> int:
+    """中断后 .part 中已下载的字节数，应大于 0 且不超过断开处"""
+    offset = part_path.stat().st_size if part_path.exists() else 0
+    expect(0 < offset <= cut, f".part 应保留断开前已下载的部分 (不超过 {cut} 字节)，实际 {offset}")
+    return offset
+
+
+def expect_resumed(request: Dict, size: int, offset: int, etag: str):
+    expect(request['range'] == f"bytes={offset}-", f"续传请求 Range 应为 bytes={offset}-，实际 {request['range']}")
+    expect(request['if_range'] == etag, f"续传请求 If-Range 应为 {etag}，实际 {request['if_range']}")
+    expect(request['status'] == 206 and request['bytes'] == size - offset,
+           f"续传响应应为 206 且只发送剩余 {size - offset} 字节: {request}")
+
+
+async def check_in_run(size: int, cut: int):
+    async with stub_workdir(size, cut) as (origin, base_url):
+        ok, _ = await download_once(base_url)
+        expect(ok, "download_file 返回 False")
+        expected = origin.body(FILE_PATH)
+        expect_complete(expected)
+    requests = file_requests(origin)
+    expect(len(requests) == 2, f"期望 2 次请求，实际 {len(requests)} 次: {requests}")
+    first, second = requests
+    expect(first['status'] == 200 and first['bytes'] == cut, f"第一次请求应为 200 且在 {cut} 字节处断开: {first}")
+    # 同一次运行内看不到中断时的 .part，从续传请求的 Range 取偏移
+    offset = int(second['range'][len('bytes='):-1]) if (second['range'] or '').startswith('bytes=') else 0
+    expect(0 < offset <= cut, f"重试应从 .part 续传 (Range 不超过 {cut})，实际 {second['range']}")
+    expect_resumed(second, size, offset, f'"{md5_of(expected)}"')
+
+
+async def check_across_runs(size: int, cut: int):
+    async with stub_workdir(size, cut) as (origin, base_url):
+        url = file_info()['url']
+        expected = origin.body(FILE_PATH)
+        etag = f'"{md5_of(expected)}"'
+        with retries(0):
+            ok, _ = await download_once(base_url, killed=True)
+        expect(not ok, "第一次运行应在断开处失败")
+
+        part_path = part_files()[0]
+        offset = part_offset(part_path, cut)
+        resumable = scraper.read_part_meta(part_path)
+        expect(resumable == (offset, {'etag': etag, 'last_modified': None, 'total': size}),
+               f".part.json 应记录 ETag {etag} 与总长度 {size}: {resumable}")
+        with open(scraper.STATE_JOURNAL, 'r', encoding='utf-8') as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        expect({'u': url, 'r': 'partial', 't': 1} in records, f"日志应记录暂时性的 partial: {records}")
+
+        ok, loaded = await download_once(base_url)
+        expect(loaded == {'seen': False, 'failed': 'partial'},
+               f"重放日志后该 URL 应为未见过的 partial: {loaded}")
+        expect(ok, "第二次运行的 download_file 返回 False")
+        expect_complete(expected)
+    requests = file_requests(origin)
+    expect(len(requests) == 2, f"期望 2 次请求，实际 {len(requests)} 次: {requests}")
+    expect_resumed(requests[1], size, offset, etag)
+
+
+async def check_if_range(size: int, cut: int):
+    async with stub_workdir(size, cut) as (origin, base_url):
+        old_etag = f'"{md5_of(origin.body(FILE_PATH))}"'
+        with retries(0):
+            await download_once(base_url)
+        offset = part_offset(part_files()[0], cut)
+        origin.revision += 1
+        expected = origin.body(FILE_PATH)
+
+        ok, loaded = await download_once(base_url)
+        expect(not loaded['seen'], f"快照中的 partial 不应记为已见过: {loaded}")
+        expect(ok, "第二次运行的 download_file 返回 False")
+        expect_complete(expected)
+    requests = file_requests(origin)
+    expect(len(requests) == 2, f"期望 2 次请求，实际 {len(requests)} 次: {requests}")
+    second = requests[1]
+    expect(second['range'] == f"bytes={offset}-" and second['if_range'] == old_etag,
+           f"第二次请求应带 Range: bytes={offset}- 与旧 ETag 的 If-Range: {second}")
+    expect(second['status'] == 200 and second['bytes'] == size, f"源文件已变化，应返回完整的 200: {second}")
+
+
+CHECKS = {'in_run': check_in_run, 'across_runs': check_across_runs, 'if_range': check_if_range}
+
+
+async def run_checks(size: int = DEFAULT_SIZE, cut: int = DEFAULT_CUT) -> List[str]:
+    """依次运行所有检查，返回未通过的项 (空列表表示全部通过)"""
+    failures = []
+    for name, check in CHECKS.items():
+        try:
+            await check(size, cut)
+        except AssertionError as e:
+            failures.append(f"{name}: {e}")
+    return failures
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="断点续传回归测试 (本地模拟源站)")
+    parser.add_argument('--size-mb', type=float, default=DEFAULT_SIZE / 1024 ** 2, help="文件大小 (MB)")
+    parser.add_argument('--cut-mb', type=float, default=DEFAULT_CUT / 1024 ** 2, help="第一次响应在此处断开 (MB)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    size = int(args.size_mb * 1024 * 1024)
+    cut = int(args.cut_mb * 1024 * 1024)
+    failures = asyncio.run(run_checks(size, cut))
+    if failures:
+        for failure in failures:
+            print(f"[失败] {failure}")
+        sys.exit(1)
+    print(f"续传校验通过 ({', '.join(CHECKS)}): {size / 1024 ** 2:.1f} MB 文件在 {cut / 1024 ** 2:.1f} MB 处中断")
+
+
+if __name__ == '__main__':
+    main()
@@ -12,10 +12,23 @@ import os
 import json
 import re
 import hashlib
-from typing import Dict, List, Optional, Tuple
+import argparse
+import mmap
+import gzip
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
 
+from blob_store import OBJECTS_STORE, link_into_store, prune_store
+from paper_meta import HAS_PDF_READER, extract_metadata, wants_metadata
+from zipstream import EPOCH_1980, ZipEntry, ZipStream
+
+try:
+    import brotli
+except ImportError:  # 可选依赖，缺失时 --compact 只输出 .gz
+    brotli = None
+
 # ============ 配置 ============
 BASE_DIR = Path(__file__).resolve().parent
 REPO_ROOT = BASE_DIR.parent
@@ -24,6 +37,25 @@ OUTPUT_DIR = REPO_ROOT / "frontend" / "public" / "data"
 MAIN_INDEX = "index.json"
 MISSING_REPORT = "missing_report.json"
 STATS_FILE = "stats.json"
+SUBJECTS_DIR = "subjects"
+HASHES_FILE = "hashes.json"
+SEARCH_INDEX = "search.json"
+# 文件指纹缓存: (相对路径, size, mtime_ns) -> md5，未变化的文件不再重新计算哈希
+CACHE_FILE = BASE_DIR / "index_cache.json"
+CACHE_VERSION = 1
+# 元数据以内容 md5 为键缓存，与路径无关，同一内容只解析一次
+META_CACHE_FILE = BASE_DIR / "meta_cache.json"
+META_CACHE_VERSION = 1
+# 并行哈希: 默认按 CPU 核数开线程 (hashlib 与文件读取都会释放 GIL)
+DEFAULT_JOBS = os.cpu_count() or 4
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# 每个 (科目, 考试, 年份, 语言) 的预打包 ZIP，manifest 记录各包的成员键，成员不变的包不重建
+BUNDLES_DIR = REPO_ROOT / "frontend" / "public" / "bundles"
+BUNDLE_MANIFEST = "manifest.json"
+BUNDLE_VERSION = 2
+# 超过此大小的包不生成 (Cloudflare Pages 单文件上限 25 MiB)，前端对这些年份回退到浏览器端打包
+BUNDLE_MAX_SIZE = 25 * 1024 * 1024
 
 # ============ 科目定义 ============
 SUBJECTS = {
@@ -94,11 +126,203 @@ CATEGORIES = {
 def calculate_md5(file_path: str) -> str:
     hash_md5 = hashlib.md5()
     with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            hash_md5.update(chunk)
+        try:
+            # mmap 一次性交给 hashlib，避免逐块拷贝；空文件或不支持 mmap 时退回分块读取
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                hash_md5.update(mm)
+        except (ValueError, OSError):
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                hash_md5.update(chunk)
     return hash_md5.hexdigest()
 
 
+def storage_stats(files: List[Tuple[Dict, str, os.stat_result]]) -> Dict:
+    """按内容与 inode 统计磁盘占用 (使用遍历时已取得的 stat，不再逐个 os.stat)
+
+    duplicate_size: 内容重复的字节数 (可去重的上限)
+    reclaimed_size: 已通过硬链接共享、实际未占用磁盘的字节数
+    """
+    total = 0
+    by_md5: Dict[str, int] = {}
+    by_inode: Dict[Tuple[int, int], int] = {}
+    for file_info, file_path, st in files:
+        if not st.st_ino:
+            # Windows 上 DirEntry.stat() 不带 inode，只能补一次 os.stat
+            st = os.stat(file_path)
+        total += st.st_size
+        by_md5[file_info['md5']] = st.st_size
+        by_inode[(st.st_dev, st.st_ino)] = st.st_size
+    return {
+        'unique_files': len(by_md5),
+        'unique_size': sum(by_md5.values()),
+        'duplicate_size': total - sum(by_md5.values()),
+        'reclaimed_size': total - sum(by_inode.values()),
+    }
+
+
+def hash_files(file_paths: List[str], jobs: int = DEFAULT_JOBS) -> List[str]:
+    """并行计算 md5，返回结果与 file_paths 顺序一一对应"""
+    if jobs <= 1 or len(file_paths) <= 1:
+        return [calculate_md5(p) for p in file_paths]
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(calculate_md5, file_paths))
+
+
+class HashCache:
+    """持久化的文件指纹缓存
+
+    以相对路径为键，记录 size / mtime_ns / inode / md5。
+    - size 与 mtime_ns 均未变化 -> 命中，直接复用 md5
+    - 路径变了但 (inode, size, mtime_ns) 相同 -> 视为重命名/移动，同样复用
+    - 本次运行未出现的路径在保存时被清理（文件已删除）
+    """
+
+    def __init__(self, path: Optional[Path] = None, enabled: bool = True):
+        self.path = Path(path or CACHE_FILE)
+        self.enabled = enabled
+        self.entries: Dict[str, Dict] = {}
+        self.by_inode: Dict[Tuple[int, int, int], str] = {}
+        self.current: Dict[str, Dict] = {}
+        self.hits = 0
+        self.misses = 0
+        self.renamed = 0
+
+    def load(self):
+        if not self.enabled or not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[警告] 加载缓存失败，将全量计算: {e}")
+            return
+        if data.get('version') != CACHE_VERSION or data.get('root') != str(ROOT_DIR):
+            print("[缓存] 版本或扫描目录已变化，忽略旧缓存")
+            return
+        self.entries = data.get('entries', {})
+        for rel_path, entry in self.entries.items():
+            ino = entry.get('ino')
+            if ino:
+                self.by_inode[(ino, entry['size'], entry['mtime_ns'])] = rel_path
+
+    def lookup(self, rel_path: str, st: os.stat_result) -> Optional[str]:
+        """返回缓存中的 md5；未命中返回 None"""
+        entry = self.entries.get(rel_path)
+        if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+            self.hits += 1
+            return entry['md5']
+        old_path = self.by_inode.get((st.st_ino, st.st_size, st.st_mtime_ns)) if st.st_ino else None
+        if old_path is not None:
+            self.hits += 1
+            self.renamed += 1
+            return self.entries[old_path]['md5']
+        self.misses += 1
+        return None
+
+    def store(self, rel_path: str, st: os.stat_result, md5: str):
+        self.current[rel_path] = {
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+            'ino': st.st_ino,
+            'md5': md5,
+        }
+
+    def save(self):
+        if not self.enabled:
+            return
+        removed = len(set(self.entries) - set(self.current))
+        data = {
+            'version': CACHE_VERSION,
+            'root': str(ROOT_DIR),
+            'entries': self.current,
+        }
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        print(f"[缓存] 命中 {self.hits}, 未命中 {self.misses} (重命名 {self.renamed}, 已清理 {removed})")
+
+
+class MetaCache:
+    """持久化的文件元数据缓存 (md5 -> 元数据)
+
+    解析失败的文件记为空 dict，同样缓存，不会在每次索引时重试。
+    本次运行未出现的 md5 在保存时被清理。
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or META_CACHE_FILE)
+        self.entries: Dict[str, Dict] = {}
+        self.used: set = set()
+
+    def load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[警告] 加载元数据缓存失败，将重新提取: {e}")
+            return
+        if data.get('version') == META_CACHE_VERSION:
+            self.entries = data.get('entries', {})
+
+    def get(self, md5: str) -> Optional[Dict]:
+        self.used.add(md5)
+        return self.entries.get(md5)
+
+    def save(self):
+        data = {
+            'version': META_CACHE_VERSION,
+            'entries': {md5: self.entries[md5] for md5 in sorted(self.used) if md5 in self.entries},
+        }
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def attach_metadata(files: List[Tuple[Dict, str]], jobs: int = DEFAULT_JOBS) -> Dict:
+    """为 PDF / MP3 附加 file_info['meta']
+
+    缓存命中的文件不做任何解析；其余按 md5 去重后在进程池中提取 (pypdf 为纯 Python，受 GIL 限制)。
+    返回 {'cached', 'extracted', 'failed'}
+    """
+    cache = MetaCache()
+    cache.load()
+    pending: Dict[str, str] = {}
+    targets = []
+    for file_info, file_path in files:
+        if not wants_metadata(file_info['name']):
+            continue
+        targets.append(file_info)
+        md5 = file_info['md5']
+        if cache.get(md5) is None and md5 not in pending:
+            pending[md5] = file_path
+
+    if pending:
+        print(f"\n[元数据] 提取 {len(pending)} 个文件 (进程数 {max(jobs, 1)})")
+        paths = list(pending.values())
+        if jobs <= 1 or len(paths) <= 1:
+            results = [extract_metadata(p) for p in paths]
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                results = list(executor.map(extract_metadata, paths, chunksize=4))
+        for md5, meta in zip(pending, results):
+            cache.entries[md5] = meta
+
+    for file_info in targets:
+        meta = cache.entries.get(file_info['md5'])
+        if meta:
+            file_info['meta'] = meta
+    cache.save()
+    return {
+        'cached': len(targets) - sum(1 for f in targets if f['md5'] in pending),
+        'extracted': len(pending),
+        'failed': sum(1 for md5 in pending if not cache.entries[md5]),
+    }
+
+
 def normalize_year_to_int(year: str) -> Optional[int]:
     """Normalize year strings (e.g., 1994al) to integer for stats/summaries"""
     if year in SPECIAL_YEARS:
@@ -124,7 +348,360 @@ def get_year_display(year: str, exam_type: str = None) -> str:
     return year
 
 
-def generate_index():
+def _scan_dirs(path) -> List[os.DirEntry]:
+    """列出 path 下的子目录 (按名称排序)，d_type 已由 scandir 缓存，无额外 stat
+
+    以 . 开头的隐藏目录跳过。
+    """
+    with os.scandir(path) as it:
+        return sorted((e for e in it if e.is_dir() and not e.name.startswith('.')),
+                      key=lambda e: e.name)
+
+
+def iter_file_records(root) -> Iterator[Dict]:
+    """遍历 {subject}/{exam_type}/{lang}/{year}/{file}，逐个产出文件记录
+
+    基于 os.scandir，目录判断复用 DirEntry 缓存的类型信息，每个文件只做一次 stat。
+    产出顺序按各级名称排序，保证索引输出稳定。记录字段:
+    subject, exam_type, lang, year, name, path (绝对路径), rel_path (相对 root), stat
+    """
+    for subject in _scan_dirs(root):
+        for exam in _scan_dirs(subject.path):
+            for lang in _scan_dirs(exam.path):
+                for year in _scan_dirs(lang.path):
+                    with os.scandir(year.path) as it:
+                        files = sorted((e for e in it if e.is_file()), key=lambda e: e.name)
+                    for entry in files:
+                        yield {
+                            'subject': subject.name,
+                            'exam_type': exam.name,
+                            'lang': lang.name,
+                            'year': year.name,
+                            'name': entry.name,
+                            'path': entry.path,
+                            'rel_path': '/'.join((subject.name, exam.name, lang.name, year.name, entry.name)),
+                            'stat': entry.stat(),
+                        }
+
+
+def get_subject_info(subject_key: str) -> Dict:
+    """获取科目信息，未登记的科目归入 Others"""
+    return SUBJECTS.get(subject_key, {
+        'name': subject_key,
+        'name_zh': subject_key,
+        'category': 'Others',
+        'icon': 'fa-folder',
+        'color': 'gray'
+    })
+
+
+def new_subject_data(subject_key: str) -> Dict:
+    """创建空的科目数据结构"""
+    subject_info = get_subject_info(subject_key)
+    return {
+        'key': subject_key,
+        'name': subject_info['name'],
+        'name_zh': subject_info['name_zh'],
+        'category': subject_info['category'],
+        'icon': subject_info['icon'],
+        'color': subject_info['color'],
+        'exams': {},  # exam_type -> {years: {year -> {lang -> [files]}}}
+        'file_count': 0,
+        'total_size': 0,
+        'years_summary': {}
+    }
+
+
+def iter_subject_files(subject_data: Dict) -> Iterator[Dict]:
+    for exam_data in subject_data['exams'].values():
+        for year_data in exam_data['years'].values():
+            for lang_data in year_data['languages'].values():
+                yield from lang_data['files']
+
+
+def encode_columnar(subject_data: Dict) -> Dict:
+    """将科目分片中的文件记录编码为紧凑的列式布局
+
+    每个语言节点的 files 变为 [name, size, md5] 数组 (提取了元数据时追加 meta 列)，并记录公共目录 dir；
+    type / type_name / paper_num 由前端按文件名查清单中的 file_types 表还原，
+    path 还原为 dir + '/' + name。
+    """
+    encoded = {k: v for k, v in subject_data.items() if k != 'exams'}
+    encoded['layout'] = 'columnar'
+    with_meta = any('meta' in f for f in iter_subject_files(subject_data))
+    encoded['file_fields'] = ['name', 'size', 'md5'] + (['meta'] if with_meta else [])
+    encoded['exams'] = {}
+    for exam_type, exam_data in subject_data['exams'].items():
+        years = {}
+        for year, year_data in exam_data['years'].items():
+            languages = {}
+            for lang, lang_data in year_data['languages'].items():
+                files = lang_data['files']
+                languages[lang] = {
+                    'name': lang_data['name'],
+                    'dir': files[0]['path'].rsplit('/', 1)[0] if files else '',
+                    'files': [[f['name'], f['size'], f['md5']] + ([f.get('meta')] if with_meta else [])
+                              for f in files],
+                }
+                if 'bundle' in lang_data:
+                    languages[lang]['bundle'] = lang_data['bundle']
+            years[year] = {'display': year_data['display'], 'languages': languages}
+        encoded['exams'][exam_type] = {
+            'name': exam_data['name'],
+            'full_name': exam_data['full_name'],
+            'years': years,
+        }
+    return encoded
+
+
+_CJK_RUN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def search_tokens(text: str) -> set:
+    """切分搜索词元
+
+    - 拉丁字母/数字按词切分，并展开前缀 (edge n-gram)，输入到一半也能命中
+    - 中文按连续汉字切出单字与相邻二字组 (bigram)
+    前端查询使用同一规则的子集：完整单词，以及汉字 bigram (单字时用 unigram)。
+    """
+    tokens = set()
+    text = str(text).lower()
+    for word in _WORD.findall(text):
+        for i in range(1, len(word) + 1):
+            tokens.add(word[:i])
+    for run in _CJK_RUN.findall(text):
+        tokens.update(run)
+        tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def build_search_index(subjects_data: Dict[str, Dict]) -> Dict:
+    """生成倒排搜索索引
+
+    docs 中每个文件一行 [subject, exam_type, year, lang, name, path]，行号即文件 id；
+    tokens 把词元映射到文件 id 的差分编码列表 (升序 id 相邻相减)，查询时只需遍历命中的 posting。
+    """
+    docs = []
+    postings: Dict[str, List[int]] = {}
+    for subject_key, subject_data in subjects_data.items():
+        subject_terms = search_tokens(' '.join((subject_key, subject_data['name'], subject_data['name_zh'])))
+        for exam_type, exam_data in subject_data['exams'].items():
+            exam_terms = search_tokens(' '.join((exam_type, exam_data['name'], exam_data['full_name'])))
+            for year, year_data in exam_data['years'].items():
+                year_terms = search_tokens(' '.join((year, year_data['display'])))
+                for lang, lang_data in year_data['languages'].items():
+                    lang_info = LANGUAGES.get(lang, {})
+                    lang_terms = search_tokens(' '.join((lang, lang_info.get('name', ''), lang_info.get('name_zh', ''))))
+                    context_terms = subject_terms | exam_terms | year_terms | lang_terms
+                    for f in lang_data['files']:
+                        doc_id = len(docs)
+                        docs.append([subject_key, exam_type, year, lang, f['name'], f['path']])
+                        stem = f['name'].rsplit('.', 1)[0]
+                        for token in context_terms | search_tokens(f"{stem} {f['type']} {f['type_name']}"):
+                            postings.setdefault(token, []).append(doc_id)
+
+    tokens = {}
+    for token in sorted(postings):
+        ids = postings[token]
+        tokens[token] = [ids[0]] + [b - a for a, b in zip(ids, ids[1:])]
+    return {
+        'doc_fields': ['subject', 'exam_type', 'year', 'lang', 'name', 'path'],
+        'docs': docs,
+        'tokens': tokens,
+    }
+
+
+def write_bytes_atomic(path: str, content: bytes):
+    """先写临时文件再 os.replace，读者不会看到写了一半的文件"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def write_bytes_if_changed(path: str, content: bytes) -> bool:
+    """内容与磁盘上的一致则不写 (mtime 保持不变)，否则原子写入；返回是否写入"""
+    try:
+        if os.path.getsize(path) == len(content):
+            with open(path, 'rb') as f:
+                if f.read() == content:
+                    return False
+    except FileNotFoundError:
+        pass
+    write_bytes_atomic(path, content)
+    return True
+
+
+def build_bundle(path: str, entries: List[ZipEntry]) -> Dict:
+    """流式写出 ZIP 包 (先写临时文件再替换)，返回 {'size', 'md5'}"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    digest = hashlib.md5()
+    size = 0
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        for chunk in ZipStream(entries).chunks():
+            digest.update(chunk)
+            f.write(chunk)
+            size += len(chunk)
+    os.replace(tmp_path, path)
+    return {'size': size, 'md5': digest.hexdigest()}
+
+
+def generate_bundles(subjects_data: Dict[str, Dict], jobs: int = DEFAULT_JOBS,
+                     max_size: int = BUNDLE_MAX_SIZE) -> Dict:
+    """为每个 (科目, 考试, 年份, 语言) 生成 ZIP 包，并把 {path, size, md5} 写入对应 lang_data['bundle']
+
+    包内成员与前端该语言列出的文件一一对应；条目按文件名排序、mtime 固定为 1980-01-01，
+    相同成员产生逐字节相同的包。成员键为全部 (arcname, size, md5) 的摘要：与 manifest 记录
+    一致且包文件仍在时直接复用，只重建成员有变化的包；不再对应任何年份的旧包会被删除。
+    预计大小超过 max_size (0 为不限制) 的包不生成、不写 bundle 字段，记入 manifest 的 skipped。
+    返回 {'built', 'reused', 'removed', 'skipped', 'count', 'size'}
+    """
+    manifest_path = os.path.join(BUNDLES_DIR, BUNDLE_MANIFEST)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        previous = manifest['bundles'] if manifest.get('version') == BUNDLE_VERSION else {}
+    except (OSError, ValueError, KeyError):
+        previous = {}
+
+    frontend_dir = REPO_ROOT / "frontend"
+    bundles: Dict[str, Dict] = {}
+    skipped: Dict[str, Dict] = {}
+    pending: List[Tuple[Dict, str, List[ZipEntry]]] = []
+    for subject_key, subject_data in subjects_data.items():
+        for exam_type, exam_data in subject_data['exams'].items():
+            for year, year_data in exam_data['years'].items():
+                for lang, lang_data in year_data['languages'].items():
+                    lang_data.pop('bundle', None)
+                    stem = f"{subject_key}_{exam_type}_{year}_{lang}"
+                    name = f"{subject_key}/{stem}.zip"
+                    members = sorted((f"{stem}/{f['name']}", f) for f in lang_data['files'])
+                    if not members:
+                        continue
+                    entries = [
+                        ZipEntry(arcname, os.path.normpath(frontend_dir / f['path']), f['size'], EPOCH_1980)
+                        for arcname, f in members
+                    ]
+                    members_key = hashlib.md5(json.dumps(
+                        [[arcname, f['size'], f['md5']] for arcname, f in members]
+                    ).encode('utf-8')).hexdigest()
+                    expected_size = ZipStream(entries).total_size()
+                    if max_size and expected_size > max_size:
+                        skipped[name] = {'members': members_key, 'size': expected_size}
+                        continue
+
+                    path = os.path.join(BUNDLES_DIR, name)
+                    bundle = {'path': os.path.relpath(path, start=frontend_dir).replace('\\', '/')}
+                    bundles[name] = {'members': members_key}
+                    cached = previous.get(name)
+                    if cached and cached['members'] == members_key:
+                        try:
+                            if os.stat(path).st_size == cached['size']:
+                                bundles[name].update(size=cached['size'], md5=cached['md5'])
+                                lang_data['bundle'] = dict(bundle, size=cached['size'], md5=cached['md5'])
+                                continue
+                        except FileNotFoundError:
+                            pass
+                    lang_data['bundle'] = bundle
+                    pending.append((bundle, name, entries))
+
+    def build(item):
+        return build_bundle(os.path.join(BUNDLES_DIR, item[1]), item[2])
+
+    if jobs <= 1 or len(pending) <= 1:
+        results = [build(item) for item in pending]
+    else:
+        # CRC32 / md5 / 文件读写都会释放 GIL，线程即可并行占满多核
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(build, pending))
+    for (bundle, name, _), info in zip(pending, results):
+        bundles[name].update(info)
+        bundle.update(info)
+
+    # 清理已不存在年份、超过大小上限的旧包与中断遗留的临时文件
+    removed = 0
+    if os.path.isdir(BUNDLES_DIR):
+        for subject_dir in _scan_dirs(BUNDLES_DIR):
+            with os.scandir(subject_dir.path) as it:
+                stale = [entry for entry in it if entry.is_file()
+                         and f"{subject_dir.name}/{entry.name}" not in bundles]
+            for entry in stale:
+                os.remove(entry.path)
+                removed += entry.name.endswith('.zip')
+            if not os.listdir(subject_dir.path):
+                os.rmdir(subject_dir.path)
+
+    os.makedirs(BUNDLES_DIR, exist_ok=True)
+    manifest = {
+        'version': BUNDLE_VERSION,
+        'max_size': max_size,
+        'bundles': dict(sorted(bundles.items())),
+        'skipped': dict(sorted(skipped.items())),
+    }
+    write_bytes_if_changed(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=1).encode('utf-8'))
+    return {
+        'built': len(pending),
+        'reused': len(bundles) - len(pending),
+        'removed': removed,
+        'skipped': len(skipped),
+        'count': len(bundles),
+        'size': sum(info['size'] for info in bundles.values()),
+    }
+
+
+def write_json(path: str, data, compact: bool = False, baseline=None) -> Dict:
+    """在内存中序列化 JSON，内容与磁盘上的一致则不写，返回 {'size', 'md5', 'changed'}
+
+    只有内容变化时才原子替换，文件的 mtime/ETag 保持稳定，CDN 与 Service Worker 缓存不会被无谓打破。
+    compact 模式输出无缩进的 JSON，并生成 .gz / .br (需 brotli) 预压缩副本，
+    同时打印与原缩进格式 (baseline，默认即 data) 相比的体积变化。
+    """
+    if compact:
+        content = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    else:
+        content = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+    md5 = hashlib.md5(content).hexdigest()
+    changed = write_bytes_if_changed(path, content)
+
+    if not compact:
+        # 清理旧的预压缩副本，避免静态托管继续返回过期内容
+        for suffix in ('.gz', '.br'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    else:
+        # 对照体积只在输出压缩报告时才需要，额外序列化一次缩进格式
+        pretty_size = len(json.dumps(data if baseline is None else baseline, ensure_ascii=False, indent=2).encode('utf-8'))
+        sizes = [f"{pretty_size / 1024:.1f} KB -> 精简 {len(content) / 1024:.1f} KB"]
+        if changed or not os.path.exists(path + '.gz'):
+            write_bytes_atomic(path + '.gz', gzip.compress(content, compresslevel=9, mtime=0))
+        sizes.append(f"gz {os.path.getsize(path + '.gz') / 1024:.1f} KB")
+        if brotli is not None:
+            if changed or not os.path.exists(path + '.br'):
+                write_bytes_atomic(path + '.br', brotli.compress(content, quality=11))
+            sizes.append(f"br {os.path.getsize(path + '.br') / 1024:.1f} KB")
+        print(f"  [压缩] {os.path.relpath(path, OUTPUT_DIR)}: {', '.join(sizes)}")
+
+    return {'size': len(content), 'md5': md5, 'changed': changed}
+
+
+def keep_last_updated(stats: Dict, stats_path: str):
+    """统计内容与上次相同则沿用上次的 last_updated，使无变化的重建产出完全相同的文件"""
+    try:
+        with open(stats_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        return
+    strip = lambda d: {k: v for k, v in d.items() if k != 'last_updated'}
+    if isinstance(previous, dict) and strip(previous) == strip(stats) and previous.get('last_updated'):
+        stats['last_updated'] = previous['last_updated']
+
+
+def generate_index(use_cache: bool = True, jobs: int = DEFAULT_JOBS, legacy_index: bool = False,
+                   compact: bool = False, columnar: bool = False, dedup: bool = False,
+                   bundles: bool = False, meta: bool = False, bundle_max_size: int = BUNDLE_MAX_SIZE,
+                   storage_report: bool = False):
     """生成索引"""
     print("=" * 60)
     print("DSE Library Indexer v2 启动")
@@ -148,152 +725,165 @@ def generate_index():
     if not os.path.exists(ROOT_DIR):
         print(f"[错误] 目录不存在: {ROOT_DIR}")
         return
+
+    hash_cache = HashCache(enabled=use_cache)
+    hash_cache.load()
+    # 缓存未命中的文件先占位，遍历结束后统一并行计算，输出顺序不受影响
+    pending_hashes: List[Tuple[Dict, str, str, os.stat_result]] = []
+    # 全部文件 (file_info, 绝对路径, 缓存键, stat)，哈希完成后用于去重与存储统计
+    all_files: List[Tuple[Dict, str, str, os.stat_result]] = []
         
-    # 遍历科目
-    for subject_key in os.listdir(ROOT_DIR):
-        subject_path = os.path.join(ROOT_DIR, subject_key)
-        if not os.path.isdir(subject_path):
-            continue
-            
-        # 获取科目信息
-        subject_info = SUBJECTS.get(subject_key, {
-            'name': subject_key,
-            'name_zh': subject_key,
-            'category': 'Others',
-            'icon': 'fa-folder',
-            'color': 'gray'
-        })
-        
-        print(f"\n[处理] {subject_info['name']} ({subject_info['name_zh']})")
-        
-        subject_data = {
-            'key': subject_key,
-            'name': subject_info['name'],
-            'name_zh': subject_info['name_zh'],
-            'category': subject_info['category'],
-            'icon': subject_info['icon'],
-            'color': subject_info['color'],
-            'exams': {},  # exam_type -> {years: {year -> {lang -> [files]}}}
-            'file_count': 0,
-            'total_size': 0,
-            'years_summary': {}
-        }
-        
-        # 遍历考试类型
-        for exam_type in os.listdir(subject_path):
-            exam_path = os.path.join(subject_path, exam_type)
-            if not os.path.isdir(exam_path):
-                continue
-                
-            exam_type_lower = exam_type.lower()
+    # 遍历文件 (单次 scandir 遍历，按 科目/考试/语言/年份/文件名 排序，同一科目的记录连续产出)
+    subject_data = None
+    for record in iter_file_records(ROOT_DIR):
+        subject_key = record['subject']
+        subject_info = get_subject_info(subject_key)
+        if subject_data is None or subject_data['key'] != subject_key:
+            if subject_data is not None:
+                print(f"  -> {subject_data['file_count']} 文件, {len(subject_data['exams'])} 考试类型")
+            print(f"\n[处理] {subject_info['name']} ({subject_info['name_zh']})")
+            subject_data = new_subject_data(subject_key)
+            subjects_data[subject_key] = subject_data
+
+        exam_type_lower = record['exam_type'].lower()
+        exam_data = subject_data['exams'].get(exam_type_lower)
+        if exam_data is None:
             exam_info = EXAM_TYPES.get(exam_type_lower, {
-                'name': exam_type.upper(),
-                'full_name': exam_type,
+                'name': record['exam_type'].upper(),
+                'full_name': record['exam_type'],
                 'year_range': (1980, 2025)
             })
-            
-            if exam_type_lower not in subject_data['exams']:
-                subject_data['exams'][exam_type_lower] = {
-                    'name': exam_info['name'],
-                    'full_name': exam_info['full_name'],
-                    'years': {}
-                }
-                
-            exam_data = subject_data['exams'][exam_type_lower]
-            
-            # 遍历语言
-            for lang in os.listdir(exam_path):
-                lang_path = os.path.join(exam_path, lang)
-                if not os.path.isdir(lang_path):
-                    continue
-                    
-                lang_lower = lang.lower()
-                
-                # 遍历年份
-                for year in os.listdir(lang_path):
-                    year_path = os.path.join(lang_path, year)
-                    if not os.path.isdir(year_path):
-                        continue
-                        
-                    if year not in exam_data['years']:
-                        exam_data['years'][year] = {
-                            'display': get_year_display(year, exam_type_lower),
-                            'languages': {}
-                        }
-                        
-                    year_data = exam_data['years'][year]
-                    
-                    if lang_lower not in year_data['languages']:
-                        year_data['languages'][lang_lower] = {
-                            'name': LANGUAGES.get(lang_lower, {}).get('name', lang),
-                            'files': []
-                        }
-                        
-                    lang_data = year_data['languages'][lang_lower]
-                    
-                    # 遍历文件
-                    for filename in os.listdir(year_path):
-                        file_path = os.path.join(year_path, filename)
-                        if not os.path.isfile(file_path):
-                            continue
-                            
-                        file_size = os.path.getsize(file_path)
-                        relative_path = os.path.relpath(file_path, start=REPO_ROOT / "frontend")
-                        
-                        file_type_info = FILE_TYPES.get(filename.lower(), {
-                            'type': 'other',
-                            'name': filename,
-                            'paper_num': None
-                        })
-                        
-                        file_info = {
-                            'name': filename,
-                            'path': relative_path.replace('\\', '/'),
-                            'size': file_size,
-                            'type': file_type_info['type'],
-                            'type_name': file_type_info['name'],
-                            'paper_num': file_type_info['paper_num'],
-                            'md5': calculate_md5(file_path)
-                        }
-                        
-                        lang_data['files'].append(file_info)
-                        subject_data['file_count'] += 1
-                        subject_data['total_size'] += file_size
-                        
-                        # 更新统计
-                        stats['total_files'] += 1
-                        stats['total_size'] += file_size
-                        stats['by_exam_type'][exam_type_lower] = stats['by_exam_type'].get(exam_type_lower, 0) + 1
-                        stats['by_category'][subject_info['category']] = stats['by_category'].get(subject_info['category'], 0) + 1
-                        stats['by_subject'][subject_key] = stats['by_subject'].get(subject_key, 0) + 1
-                        norm_year = normalize_year_to_int(year)
-                        if norm_year is not None:
-                            stats['by_year'][str(norm_year)] = stats['by_year'].get(str(norm_year), 0) + 1
-                            
-        subjects_data[subject_key] = subject_data
+            exam_data = subject_data['exams'][exam_type_lower] = {
+                'name': exam_info['name'],
+                'full_name': exam_info['full_name'],
+                'years': {}
+            }
+
+        year = record['year']
+        if year not in exam_data['years']:
+            exam_data['years'][year] = {
+                'display': get_year_display(year, exam_type_lower),
+                'languages': {}
+            }
+        year_data = exam_data['years'][year]
+
+        lang_lower = record['lang'].lower()
+        if lang_lower not in year_data['languages']:
+            year_data['languages'][lang_lower] = {
+                'name': LANGUAGES.get(lang_lower, {}).get('name', record['lang']),
+                'files': []
+            }
+        lang_data = year_data['languages'][lang_lower]
+
+        filename = record['name']
+        file_path = record['path']
+        st = record['stat']
+        file_size = st.st_size
+        relative_path = os.path.relpath(file_path, start=REPO_ROOT / "frontend")
+        cache_key = record['rel_path']
+        md5 = hash_cache.lookup(cache_key, st)
+
+        file_type_info = FILE_TYPES.get(filename.lower(), {
+            'type': 'other',
+            'name': filename,
+            'paper_num': None
+        })
+
+        file_info = {
+            'name': filename,
+            'path': relative_path.replace('\\', '/'),
+            'size': file_size,
+            'type': file_type_info['type'],
+            'type_name': file_type_info['name'],
+            'paper_num': file_type_info['paper_num'],
+            'md5': md5
+        }
+
+        if md5 is None:
+            pending_hashes.append((file_info, file_path, cache_key, st))
+        else:
+            hash_cache.store(cache_key, st, md5)
+
+        lang_data['files'].append(file_info)
+        all_files.append((file_info, file_path, cache_key, st))
+        subject_data['file_count'] += 1
+        subject_data['total_size'] += file_size
+
+        # 更新统计
+        stats['total_files'] += 1
+        stats['total_size'] += file_size
+        stats['by_exam_type'][exam_type_lower] = stats['by_exam_type'].get(exam_type_lower, 0) + 1
+        stats['by_category'][subject_info['category']] = stats['by_category'].get(subject_info['category'], 0) + 1
+        stats['by_subject'][subject_key] = stats['by_subject'].get(subject_key, 0) + 1
+        norm_year = normalize_year_to_int(year)
+        if norm_year is not None:
+            stats['by_year'][str(norm_year)] = stats['by_year'].get(str(norm_year), 0) + 1
+
+    if subject_data is not None:
         print(f"  -> {subject_data['file_count']} 文件, {len(subject_data['exams'])} 考试类型")
+
+    if pending_hashes:
+        print(f"\n[哈希] 计算 {len(pending_hashes)} 个文件的 md5 (并行度 {max(jobs, 1)})")
+        hashes = hash_files([item[1] for item in pending_hashes], jobs)
+        for (file_info, _, cache_key, st), md5 in zip(pending_hashes, hashes):
+            file_info['md5'] = md5
+            hash_cache.store(cache_key, st, md5)
+
+    # 内容去重：相同 md5 的文件硬链接到共享存储 OBJECTS_STORE 下的同一个 blob (与爬虫 --dedup 共用)
+    if dedup:
+        linked = 0
+        for i, (file_info, file_path, cache_key, _) in enumerate(all_files):
+            try:
+                saved = link_into_store(file_path, file_info['md5'])
+            except OSError as e:
+                print(f"[警告] 去重失败 {file_path}: {e}")
+                continue
+            if saved:
+                linked += 1
+                # 硬链接后 inode/mtime 变为 blob 的，更新缓存避免下次重复计算
+                st = os.stat(file_path)
+                hash_cache.store(cache_key, st, file_info['md5'])
+                all_files[i] = (file_info, file_path, cache_key, st)
+        pruned = prune_store()
+        print(f"\n[去重] 新链接 {linked} 个重复文件, 清理无引用 blob {pruned} 个")
+    # 存储统计只在去重或显式要求报告时计算
+    if dedup or storage_report:
+        stats['storage'] = storage_stats([(file_info, file_path, st) for file_info, file_path, _, st in all_files])
+        if stats['storage']['duplicate_size']:
+            print(f"[去重] 重复内容 {stats['storage']['duplicate_size'] / 1024 / 1024:.2f} MB, "
+                  f"已节省 {stats['storage']['reclaimed_size'] / 1024 / 1024:.2f} MB")
+
+    # PDF / MP3 元数据 (按 md5 缓存，已处理过的内容直接复用)
+    if meta:
+        if not HAS_PDF_READER:
+            print("\n[警告] 未安装 pypdf，跳过 PDF 元数据，仅提取 mp3 时长")
+        meta_stats = attach_metadata([(file_info, file_path) for file_info, file_path, _, _ in all_files], jobs)
+        print(f"[元数据] 缓存命中 {meta_stats['cached']}, 新提取 {meta_stats['extracted']}, "
+              f"无法解析 {meta_stats['failed']}")
+
+    # 预打包 (写分片前生成，分片中的 bundle 引用带上包的大小与哈希)
+    if bundles:
+        bundle_stats = generate_bundles(subjects_data, jobs, bundle_max_size)
+        stats['bundles'] = {'count': bundle_stats['count'], 'skipped': bundle_stats['skipped'],
+                            'total_size': bundle_stats['size']}
+        print(f"\n[打包] {bundle_stats['count']} 个年份包: 重建 {bundle_stats['built']}, "
+              f"复用 {bundle_stats['reused']}, 清理 {bundle_stats['removed']}, "
+              f"超过上限跳过 {bundle_stats['skipped']} "
+              f"({bundle_stats['size'] / 1024 / 1024:.2f} MB)")
         
     # 生成输出
+    # 每个输出先在内存中生成，与磁盘内容比较后仅写出变化的文件；outputs 记录全部输出的哈希
+    outputs: Dict[str, Dict] = {}
+
+    def emit(name: str, data, baseline=None) -> Dict:
+        info = write_json(os.path.join(OUTPUT_DIR, name), data, compact, baseline=baseline)
+        outputs[name] = info
+        return info
+
+    keep_last_updated(stats, os.path.join(OUTPUT_DIR, STATS_FILE))
     
-    # 1. 分科目JSON
-    subjects_dir = os.path.join(OUTPUT_DIR, 'subjects')
-    os.makedirs(subjects_dir, exist_ok=True)
-    
-    for subject_key, subject_data in subjects_data.items():
-        subject_file = os.path.join(subjects_dir, f"{subject_key}.json")
-        with open(subject_file, 'w', encoding='utf-8') as f:
-            json.dump(subject_data, f, ensure_ascii=False, indent=2)
-            
-    print(f"\n[输出] 科目数据: {len(subjects_data)} 个文件")
-    
-    # 2. 主索引
-    import copy
-    index_subjects = []
-    
+    # 年份汇总 (写分片前计算，保证分片与主索引一致)
     for subject_key, subject_data in subjects_data.items():
-        index_subjects.append(subject_data)
-        
-        # 年份汇总
         for exam_type, exam_data in subject_data['exams'].items():
             years = []
             for y in exam_data['years'].keys():
@@ -306,6 +896,38 @@ def generate_index():
                     'max': max(years),
                     'count': len(set(years))
                 }
+
+    # 1. 分科目JSON (分片，前端选中科目时按需加载)
+    subjects_dir = os.path.join(OUTPUT_DIR, SUBJECTS_DIR)
+    os.makedirs(subjects_dir, exist_ok=True)
+    
+    shards: Dict[str, Dict] = {}
+    for subject_key, subject_data in subjects_data.items():
+        shard_name = f"{SUBJECTS_DIR}/{subject_key}.json"
+        shard_data = encode_columnar(subject_data) if columnar else subject_data
+        shard = emit(shard_name, shard_data, baseline=subject_data)
+        shards[subject_key] = {'path': shard_name, 'size': shard['size'], 'md5': shard['md5']}
+
+    # 清理已不存在科目的旧分片
+    for entry in os.scandir(subjects_dir):
+        subject_key = entry.name.split('.', 1)[0]
+        if entry.is_file() and subject_key not in shards and '.json' in entry.name:
+            os.remove(entry.path)
+            print(f"  [清理] {SUBJECTS_DIR}/{entry.name}")
+            
+    print(f"\n[输出] 科目数据: {len(subjects_data)} 个文件")
+    
+    # 2. 主索引
+    # 默认只输出精简清单 (不含 exams 明细，附带分片路径与哈希)；legacy 模式内嵌完整 exams 树
+    if legacy_index:
+        index_subjects = list(subjects_data.values())
+    else:
+        index_subjects = [
+            {**{k: v for k, v in subject_data.items() if k != 'exams'},
+             'exam_types': list(subject_data['exams'].keys()),
+             'shard': shards[subject_key]}
+            for subject_key, subject_data in subjects_data.items()
+        ]
         
     # 按分类分组
     categories_list = []
@@ -321,6 +943,7 @@ def generate_index():
             })
             
     index_data = {
+        'format': 'full' if legacy_index else 'sharded',
         'subjects': index_subjects,
         'categories': categories_list,
         'exam_types': [
@@ -336,30 +959,77 @@ def generate_index():
             {'key': key, 'name': info['name'], 'name_zh': info['name_zh']}
             for key, info in LANGUAGES.items()
         ],
+        # 文件类型表，列式分片据此还原 type / type_name / paper_num
+        'file_types': FILE_TYPES,
         'stats': stats
     }
     
-    with open(os.path.join(OUTPUT_DIR, MAIN_INDEX), 'w', encoding='utf-8') as f:
-        json.dump(index_data, f, ensure_ascii=False, indent=2)
-    print(f"[输出] 主索引: {MAIN_INDEX}")
+    # 搜索索引单独成文件，前端首次搜索时再加载
+    search_info = emit(SEARCH_INDEX, build_search_index(subjects_data))
+    if not legacy_index:
+        index_data['search'] = {'path': SEARCH_INDEX, 'size': search_info['size'], 'md5': search_info['md5']}
+    print(f"[输出] 搜索索引: {SEARCH_INDEX} ({search_info['size'] / 1024:.1f} KB)")
+
+    index_info = emit(MAIN_INDEX, index_data)
+    print(f"[输出] 主索引: {MAIN_INDEX} ({'完整' if legacy_index else '精简清单'}, {index_info['size'] / 1024:.1f} KB)")
     
     # 3. 缺漏报告
-    with open(os.path.join(OUTPUT_DIR, MISSING_REPORT), 'w', encoding='utf-8') as f:
-        json.dump(missing_data, f, ensure_ascii=False, indent=2)
+    emit(MISSING_REPORT, missing_data)
     print(f"[输出] 缺漏报告: {MISSING_REPORT}")
     
     # 4. 统计信息
-    with open(os.path.join(OUTPUT_DIR, STATS_FILE), 'w', encoding='utf-8') as f:
-        json.dump(stats, f, ensure_ascii=False, indent=2)
+    emit(STATS_FILE, stats)
     print(f"[输出] 统计信息: {STATS_FILE}")
+
+    # 5. 内容哈希清单，客户端据此低成本判断哪些文件需要重新拉取
+    changed = sorted(name for name, info in outputs.items() if info['changed'])
+    hashes = {name: {'size': info['size'], 'md5': info['md5']} for name, info in sorted(outputs.items())}
+    hashes_info = write_json(os.path.join(OUTPUT_DIR, HASHES_FILE), {'files': hashes}, compact)
+    if hashes_info['changed']:
+        changed.append(HASHES_FILE)
+    print(f"[输出] 哈希清单: {HASHES_FILE}")
+    print(f"[输出] 写入 {len(changed)} 个文件, 未变化 {len(outputs) + 1 - len(changed)} 个")
+
+    hash_cache.save()
     
     print("\n" + "=" * 60)
     print("索引生成完成!")
     print(f"总计科目: {len(subjects_data)}")
     print(f"总计文件: {stats['total_files']}")
     print(f"总计大小: {stats['total_size'] / 1024 / 1024:.2f} MB")
+    if 'storage' in stats:
+        print(f"实际占用: {(stats['total_size'] - stats['storage']['reclaimed_size']) / 1024 / 1024:.2f} MB")
     print("=" * 60)
 
 
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="DSE Library 索引生成器")
+    parser.add_argument('--no-cache', action='store_true',
+                        help=f"忽略并且不写入指纹缓存 ({CACHE_FILE.name})，全量计算 md5")
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_JOBS,
+                        help=f"并行度: md5 / 打包的线程数与元数据提取的进程数，1 为串行 (默认 {DEFAULT_JOBS})")
+    parser.add_argument('--legacy-index', action='store_true',
+                        help=f"{MAIN_INDEX} 内嵌全部科目的 exams 明细 (旧格式)，默认只输出精简清单")
+    parser.add_argument('--compact', action='store_true',
+                        help="输出无缩进 JSON，并生成 .gz/.br 预压缩副本供静态托管使用")
+    parser.add_argument('--columnar', action='store_true',
+                        help="科目分片使用列式文件记录 (类型信息查 file_types 表，不再逐条重复)")
+    parser.add_argument('--dedup', action='store_true',
+                        help=f"内容相同的文件硬链接到 {OBJECTS_STORE} 下的同一个 blob (与爬虫共用)，只占一份磁盘空间")
+    parser.add_argument('--storage-report', action='store_true',
+                        help="统计内容重复与硬链接节省的字节数，写入统计信息的 storage (--dedup 时总会统计)")
+    parser.add_argument('--bundles', action='store_true',
+                        help="为每个 科目/考试/年份/语言 生成可复现的 ZIP 包 (并行构建，仅重建成员有变化的包)")
+    parser.add_argument('--bundle-max-mb', type=float, default=BUNDLE_MAX_SIZE / 1024 / 1024,
+                        help="超过此大小 (MiB) 的包不生成，前端回退到浏览器端打包；0 为不限制 (默认 %(default)g)")
+    parser.add_argument('--meta', action='store_true',
+                        help=f"提取 PDF 页数/标题/首页摘要 (需 pypdf) 与 mp3 时长，按 md5 缓存到 {META_CACHE_FILE.name}")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    generate_index()
+    args = parse_args()
+    generate_index(use_cache=not args.no_cache, jobs=args.jobs, legacy_index=args.legacy_index,
+                   compact=args.compact, columnar=args.columnar, dedup=args.dedup,
+                   bundles=args.bundles, meta=args.meta,
+                   bundle_max_size=int(args.bundle_max_mb * 1024 * 1024), storage_report=args.storage_report)
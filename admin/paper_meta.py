@@ -0,0 +1,129 @@
+"""试卷元数据提取
+- PDF: 页数、文档标题 (Info /Title)、首页文字摘要，需要可选依赖 pypdf
+- MP3: 时长，直接解析帧头 (Xing/Info/VBRI 头给出总帧数，否则按 CBR 码率估算)，无额外依赖
+
+extract_metadata 为模块级函数，供索引器在进程池中调用；解析失败返回空 dict，
+由调用方按 md5 缓存结果，同一内容只处理一次。
+"""
+
+import os
+import re
+import logging
+from typing import Dict, Optional
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # 可选依赖，缺失时跳过 PDF，只提取 mp3 时长
+    PdfReader = None
+
+SNIPPET_CHARS = 160
+TITLE_CHARS = 120
+MP3_SCAN_BYTES = 64 * 1024
+
+# MPEG 版本位: 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5
+_MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+# Layer III 码率表 (kbps)，下标为帧头中的码率索引
+_MP3_BITRATES = {
+    3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_WHITESPACE = re.compile(r'\s+')
+
+HAS_PDF_READER = PdfReader is not None
+
+
+def _clean_text(text: str, limit: int) -> str:
+    return _WHITESPACE.sub(' ', text or '').strip()[:limit]
+
+
+def pdf_metadata(path: str) -> Dict:
+    """{'pages', 'title'?, 'snippet'?}；只解析文档目录与第一页"""
+    reader = PdfReader(path, strict=False)
+    meta = {'pages': len(reader.pages)}
+    info = reader.metadata
+    title = _clean_text(info.title, TITLE_CHARS) if info and isinstance(info.title, str) else ''
+    if title:
+        meta['title'] = title
+    if meta['pages']:
+        snippet = _clean_text(reader.pages[0].extract_text(), SNIPPET_CHARS)
+        if snippet:
+            meta['snippet'] = snippet
+    return meta
+
+
+def _mp3_frame(header: bytes):
+    """解析 4 字节 Layer III 帧头，返回 (version, sample_rate, bitrate, 帧长, 声道模式)；不是有效帧头返回 None"""
+    if header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 3
+    layer = (header[1] >> 1) & 3
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 3
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    bitrate = _MP3_BITRATES[3 if version == 3 else 2][bitrate_index] * 1000
+    padding = (header[2] >> 1) & 1
+    frame_length = (144 if version == 3 else 72) * bitrate // sample_rate + padding
+    return version, sample_rate, bitrate, frame_length, header[3] >> 6
+
+
+def mp3_duration(path: str) -> Optional[float]:
+    """MP3 时长 (秒)，无法识别时返回 None"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        head = f.read(10)
+        offset = 0
+        if head[:3] == b'ID3' and len(head) == 10:
+            offset = 10 + ((head[6] & 0x7F) << 21 | (head[7] & 0x7F) << 14 | (head[8] & 0x7F) << 7 | (head[9] & 0x7F))
+            if head[5] & 0x10:  # 带 footer
+                offset += 10
+        f.seek(offset)
+        data = f.read(MP3_SCAN_BYTES)
+        f.seek(max(size - 128, 0))
+        if f.read(3) == b'TAG':  # ID3v1 尾标签
+            size -= 128
+
+    for i in range(len(data) - 4):
+        frame = _mp3_frame(data[i:i + 4])
+        if frame is None:
+            continue
+        version, sample_rate, bitrate, frame_length, channel_mode = frame
+        # 下一帧也必须是有效帧头，排除数据中偶然出现的同步字
+        following = data[i + frame_length:i + frame_length + 4]
+        if len(following) == 4 and _mp3_frame(following) is None:
+            continue
+        samples_per_frame = 1152 if version == 3 else 576
+        mono = channel_mode == 3
+        side_info = (17 if mono else 32) if version == 3 else (9 if mono else 17)
+        xing = i + 4 + side_info
+        if data[xing:xing + 4] in (b'Xing', b'Info') and int.from_bytes(data[xing + 4:xing + 8], 'big') & 1:
+            frames = int.from_bytes(data[xing + 8:xing + 12], 'big')
+            return round(frames * samples_per_frame / sample_rate, 1)
+        vbri = i + 4 + 32
+        if data[vbri:vbri + 4] == b'VBRI':
+            frames = int.from_bytes(data[vbri + 14:vbri + 18], 'big')
+            return round(frames * samples_per_frame / sample_rate, 1)
+        return round((size - offset - i) * 8 / bitrate, 1)
+    return None
+
+
+def wants_metadata(name: str) -> bool:
+    """该文件是否有可提取的元数据 (缺少 pypdf 时不处理 PDF，安装后下次索引会补上)"""
+    lower = name.lower()
+    return lower.endswith('.mp3') or (lower.endswith('.pdf') and HAS_PDF_READER)
+
+
+def extract_metadata(path: str) -> Dict:
+    """按扩展名提取元数据；文件损坏或格式无法识别时返回 {}"""
+    logging.getLogger('pypdf').setLevel(logging.ERROR)
+    lower = path.lower()
+    try:
+        if lower.endswith('.pdf') and HAS_PDF_READER:
+            return pdf_metadata(path)
+        if lower.endswith('.mp3'):
+            duration = mp3_duration(path)
+            return {'duration': duration} if duration is not None else {}
+    except Exception:
+        pass
+    return {}
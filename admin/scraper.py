@@ -2,21 +2,32 @@
 Features:
   1. Full concurrent probing with asyncio.gather
   2. Direct GET without HEAD probe
-  3. Minimal delays for maximum speed
+  3. Adaptive (AIMD) concurrency instead of fixed delays, with retry/backoff on 429/5xx
 """
 
 import os
+import sys
+import time
+import queue
+import atexit
 import asyncio
+import threading
 import aiohttp
 import aiofiles
 import json
 import random
+import hashlib
+import argparse
+from email.utils import formatdate, parsedate_to_datetime
+from collections import deque
 from urllib.parse import urljoin, unquote
 from bs4 import BeautifulSoup
 from datetime import datetime
 from typing import Optional, Set, Dict, List, Tuple
 from pathlib import Path
 
+from blob_store import link_into_store, prune_store
+
 # ============ 配置 ============
 BASE_URL = "https://dselib.com"
 FILE_BASE_URL = "https://src.dselib.com/"
@@ -25,15 +36,41 @@ REPO_ROOT = BASE_DIR.parent
 # Mirror files into the same place the indexer expects
 DOWNLOAD_DIR = REPO_ROOT / "frontend" / "public" / "downloads"
 STATE_FILE = BASE_DIR / "scraper_state.json"
-LOG_FILE = BASE_DIR / "scraper.log"
+# 追加式状态日志：每个 URL 结果一行 JSON，定期压缩回 STATE_FILE 快照
+STATE_JOURNAL = BASE_DIR / "scraper_state.journal"
+JOURNAL_COMPACT_THRESHOLD = 20000  # 日志累计记录数超过该值时压缩
+LOG_FILE = BASE_DIR / "scraper.log"  # JSON Lines: {"ts", "level", "msg", ...}
+LOG_FLUSH_INTERVAL = 0.5   # 日志批量写出间隔 (秒)
+LOG_BATCH_LINES = 1000     # 单批最多条数
+LOG_MAX_BYTES = 5 * 1024 * 1024  # 超过后轮转为 scraper.log.1 ...
+LOG_BACKUPS = 3
+PROGRESS_INTERVAL = 1.0    # --events 模式下进度事件的推送间隔 (秒)
+PROBE_STATS_FILE = BASE_DIR / "probe_stats.json"
 
 # 爬虫设置 - 极速模式
-MAX_CONCURRENT = 30  # 高并发
-MIN_DELAY = 0.05     # 最小延时
-MAX_DELAY = 0.1
-MAX_RETRIES = 2      # 减少重试次数加快速度
+# 并发数由 AdaptiveLimiter 按 AIMD 在 [MIN_CONCURRENT, MAX_CONCURRENT] 之间自动调整
+MAX_CONCURRENT = 64  # 并发上限 (连接池大小)
+MIN_CONCURRENT = 2
+INITIAL_CONCURRENT = 16
+LATENCY_TOLERANCE = 2.0  # 响应延迟 (EWMA) 超过最低延迟的该倍数时停止加并发
+BACKOFF_FACTOR = 0.5     # 遇到 429/5xx/超时时并发乘以该系数
+MAX_RETRIES = 2      # 429/5xx/超时/连接错误的重试次数
+RETRY_BASE_DELAY = 0.5   # 指数退避基数 (秒)，实际等待在 [0, base * 2^n] 内随机
+RETRY_MAX_DELAY = 30.0
+RETRY_AFTER_MAX = 120.0  # Retry-After 最长遵守时间
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# 暂时性失败 (限流/服务端错误/超时/中断)：记入 failed_urls 但不算“已见过”，下次运行重试
+TRANSIENT_FAILURES = {str(status) for status in RETRY_STATUSES} | {'exception', 'partial'}
 TIMEOUT = 20
-BATCH_SIZE = 50      # 每批并发数量
+WORKERS = MAX_CONCURRENT  # 常驻下载协程数，从队列持续取任务，连接不会因等待整批而空闲
+QUEUE_SIZE = WORKERS * 4  # 待处理队列上限 (背压)
+STATE_FLUSH_INTERVAL = 5.0  # 状态落盘/进度日志间隔 (秒)
+DOWNLOAD_CHUNK_SIZE = 256 * 1024  # 流式下载每块大小，单个下载的内存占用上限
+
+# 探测调度：先探测每个 (语言, 年份) 的哨兵文件，命中后才展开其余文件名
+EXHAUSTIVE_PROBE = False   # True 时退回全量笛卡尔积探测 (命令行 --exhaustive)
+SENTINEL_PATTERNS = ['p1.pdf', 'ans.pdf', 'p1a.pdf']
+PRUNE_MIN_TRIES = 300      # 某文件名累计探测超过该次数仍从未命中，则不再展开
 
 # 科目列表
 SUBJECTS = {
@@ -66,11 +103,28 @@ HEADERS = {
 
 
 class ScraperState:
+    """爬虫状态
+
+    STATE_FILE 是完整快照 (格式与 admin_server.get_status 读取的一致)，
+    STATE_JOURNAL 是快照之后的增量记录，每行一个 JSON:
+      {"u": url, "r": "ok", "m": md5, "v": {...}}  下载成功 (v 为 ETag/Last-Modified/大小)
+      {"u": url, "r": "404"}           失败/不存在 (r 为原因；partial 表示留有可续传的 .part)
+      {"u": url, "r": "429", "t": 1}   暂时性失败 (TRANSIENT_FAILURES)，不计入 seen_urls，下次运行重试
+      {"p": subject_key, "v": {...}}   科目进度
+    save() 只追加自上次以来的新记录，避免每批全量重写；记录数超过阈值或 close() 时
+    compact() 重写快照并清空日志。load() 先读快照再重放日志。
+    """
+
     def __init__(self):
         self.downloaded_files: Set[str] = set()
         self.failed_urls: Dict[str, str] = {}
         self.progress: Dict[str, Dict] = {}
         self.seen_urls: Set[str] = set()
+        self.file_md5: Dict[str, str] = {}  # url -> 下载时顺带计算的 md5
+        self.validators: Dict[str, Dict] = {}  # url -> {etag, last_modified, size}，供 refresh 模式条件请求
+        self._pending: List[str] = []
+        self._dirty_progress: Set[str] = set()
+        self._journal_records = 0
 
     def load(self):
         if os.path.exists(STATE_FILE):
@@ -80,14 +134,58 @@ class ScraperState:
                     self.downloaded_files = set(data.get('downloaded_files', []))
                     self.failed_urls = data.get('failed_urls', {})
                     self.progress = data.get('progress', {})
+                    self.file_md5 = data.get('file_md5', {})
+                    self.validators = data.get('validators', {})
                     # 回填 seen_urls 兼容旧状态文件
                     self.seen_urls = set(data.get('seen_urls', []))
                     if not self.seen_urls:
                         self.seen_urls.update(self.downloaded_files)
                         self.seen_urls.update(self.failed_urls.keys())
-                    log(f"[状态] 已加载: {len(self.downloaded_files)} 已下载")
+                    # 旧状态把暂时性失败也记为已见过，移出后下次运行重试
+                    self.seen_urls.difference_update(
+                        url for url, reason in self.failed_urls.items() if reason in TRANSIENT_FAILURES)
             except Exception as e:
                 log(f"[警告] 加载状态失败: {e}")
+        replayed = self._replay_journal()
+        if os.path.exists(STATE_FILE) or replayed:
+            log(f"[状态] 已加载: {len(self.downloaded_files)} 已下载 (重放日志 {replayed} 条)")
+        if replayed:
+            # 上次异常退出留下的日志 (末行可能不完整) 先并入快照，本次从空日志开始追加
+            self.compact()
+
+    def _replay_journal(self) -> int:
+        if not os.path.exists(STATE_JOURNAL):
+            return 0
+        count = 0
+        with open(STATE_JOURNAL, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 进程被杀时最后一行可能不完整，忽略即可
+                    continue
+                self._apply(record)
+                count += 1
+        self._journal_records = count
+        return count
+
+    def _apply(self, record: Dict):
+        if 'u' in record:
+            url = record['u']
+            if record.get('r') == 'ok':
+                self.downloaded_files.add(url)
+                self.failed_urls.pop(url, None)
+                if record.get('m'):
+                    self.file_md5[url] = record['m']
+                if record.get('v'):
+                    self.validators[url] = record['v']
+            else:
+                self.failed_urls[url] = record.get('r', 'exception')
+                if record.get('t'):
+                    return
+            self.seen_urls.add(url)
+        elif 'p' in record:
+            self.progress[record['p']] = record.get('v', {})
 
     def _ensure_subject_progress(self, subject_key: str, total_urls: int | None = None):
         """确保 progress[subject_key] 存在，并包含累计字段（支持断点续跑/重启不丢进度）"""
@@ -100,25 +198,193 @@ class ScraperState:
         p.setdefault('seen_total', 0)
         p.setdefault('timestamp', datetime.now().isoformat())
         self.progress[subject_key] = p
+        self._dirty_progress.add(subject_key)
+
+    def _count(self, subject_key: Optional[str], **deltas: int):
+        # 累计进度（subject_key 可能为空，做保护）
+        if not subject_key:
+            return
+        self._ensure_subject_progress(subject_key)
+        p = self.progress[subject_key]
+        for field, delta in deltas.items():
+            if delta:
+                p[field] = int(p.get(field, 0)) + delta
+        p['timestamp'] = datetime.now().isoformat()
+
+    def _journal_ok(self, url: str, md5: Optional[str], validators: Optional[Dict]):
+        record = {'u': url, 'r': 'ok'}
+        if md5:
+            self.file_md5[url] = md5
+            record['m'] = md5
+        if validators:
+            self.validators[url] = validators
+            record['v'] = validators
+        self._pending.append(json.dumps(record, ensure_ascii=False))
+
+    def mark_downloaded(self, url: str, subject_key: Optional[str] = None, md5: Optional[str] = None,
+                        validators: Optional[Dict] = None):
+        first_seen = url not in self.seen_urls
+        # 断点续传成功的 URL 之前记为 partial，这里转为已下载
+        was_failed = self.failed_urls.pop(url, None) is not None
+        self.downloaded_files.add(url)
+        self.seen_urls.add(url)
+        self._journal_ok(url, md5, validators)
+        self._count(subject_key, downloaded_total=1, failed_total=-int(was_failed), seen_total=int(first_seen))
+
+    def mark_refreshed(self, url: str, md5: Optional[str], validators: Optional[Dict]):
+        """refresh 模式重新校验过的文件：只更新 md5 与校验信息，不计入下载计数"""
+        self._journal_ok(url, md5, validators)
+
+    def mark_failed(self, url: str, reason: str, subject_key: Optional[str] = None):
+        """记录失败；404 等永久性结果记为已见过，之后的运行跳过，暂时性失败 (TRANSIENT_FAILURES) 下次重试"""
+        was_failed = url in self.failed_urls
+        self.failed_urls[url] = reason
+        if reason in TRANSIENT_FAILURES:
+            self._pending.append(json.dumps({'u': url, 'r': reason, 't': 1}, ensure_ascii=False))
+            self._count(subject_key, failed_total=int(not was_failed))
+            return
+        first_seen = url not in self.seen_urls
+        self.seen_urls.add(url)
+        self._pending.append(json.dumps({'u': url, 'r': reason}, ensure_ascii=False))
+        self._count(subject_key, failed_total=int(not was_failed), seen_total=int(first_seen))
 
     def save(self):
+        """把缓冲的增量记录追加到日志，必要时压缩"""
+        for subject_key in sorted(self._dirty_progress):
+            self._pending.append(json.dumps({'p': subject_key, 'v': self.progress[subject_key]}, ensure_ascii=False))
+        self._dirty_progress.clear()
+        if self._pending:
+            with open(STATE_JOURNAL, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(self._pending) + '\n')
+            self._journal_records += len(self._pending)
+            self._pending.clear()
+        if self._journal_records >= JOURNAL_COMPACT_THRESHOLD:
+            self.compact()
+
+    def compact(self):
+        """重写完整快照并清空日志 (先原子替换快照，再删日志；中途崩溃时重放日志是幂等的)"""
+        for subject_key in sorted(self._dirty_progress):
+            self._pending.append(json.dumps({'p': subject_key, 'v': self.progress[subject_key]}, ensure_ascii=False))
+        self._dirty_progress.clear()
+        self._pending.clear()
         data = {
             'downloaded_files': list(self.downloaded_files),
             'failed_urls': self.failed_urls,
             'progress': self.progress,
             'seen_urls': list(self.seen_urls),
+            'file_md5': self.file_md5,
+            'validators': self.validators,
             'last_update': datetime.now().isoformat()
         }
-        with open(STATE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        tmp_file = STATE_FILE.with_name(STATE_FILE.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_file, STATE_FILE)
+        if os.path.exists(STATE_JOURNAL):
+            os.remove(STATE_JOURNAL)
+        self._journal_records = 0
+
+
+class LogWriter:
+    """后台线程批量写日志
+
+    log() 只把记录放进队列，不在事件循环上做任何文件/终端 IO；
+    写线程每 LOG_FLUSH_INTERVAL 秒 (或攒满 LOG_BATCH_LINES 条) 一次性写出：
+    终端输出可读文本，LOG_FILE 写 JSON Lines，超过 LOG_MAX_BYTES 时轮转。
+    json_stdout=True 时 (--events，由管理后台启动) 终端也输出 JSON Lines，
+    并附带 emit_event() 产生的事件记录 (带 event 字段，不写入 LOG_FILE)。
+    """
+
+    def __init__(self):
+        self.json_stdout = False
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.thread: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+        self.file = None
+        self.file_path: Optional[Path] = None
+
+    def write(self, record: Dict):
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+                    self.thread.start()
+        self.queue.put(record)
+
+    def flush(self, timeout: float = 5.0):
+        """阻塞直到此前的记录全部写出 (退出前调用)"""
+        if self.thread is None:
+            return
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+            while len(batch) < LOG_BATCH_LINES and not isinstance(batch[-1], threading.Event):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            records = [r for r in batch if not isinstance(r, threading.Event)]
+            try:
+                if records:
+                    self._write_batch(records)
+            except Exception as e:
+                sys.stderr.write(f"[log-writer] 写日志失败: {e}\n")
+            for r in batch:
+                if isinstance(r, threading.Event):
+                    r.set()
+
+    def _write_batch(self, records: List[Dict]):
+        if self.json_stdout:
+            sys.stdout.write(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records))
+        else:
+            sys.stdout.write(''.join(f"[{r['ts'][:19].replace('T', ' ')}] [{r['level']}] {r['msg']}\n"
+                                     for r in records if 'event' not in r))
+        sys.stdout.flush()
+        records = [r for r in records if 'event' not in r]
+        if not records:
+            return
+        path = Path(LOG_FILE)
+        if self.file is None or self.file_path != path:
+            if self.file:
+                self.file.close()
+            self.file = open(path, 'a', encoding='utf-8')
+            self.file_path = path
+        self.file.write(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records))
+        self.file.flush()
+        if self.file.tell() >= LOG_MAX_BYTES:
+            self._rotate()
 
+    def _rotate(self):
+        self.file.close()
+        self.file = None
+        for i in range(LOG_BACKUPS - 1, 0, -1):
+            src = self.file_path.with_name(f"{self.file_path.name}.{i}")
+            if src.exists():
+                os.replace(src, self.file_path.with_name(f"{self.file_path.name}.{i + 1}"))
+        os.replace(self.file_path, self.file_path.with_name(f"{self.file_path.name}.1"))
 
-def log(message: str, level: str = "INFO"):
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_line = f"[{timestamp}] [{level}] {message}"
-    print(log_line)
-    with open(LOG_FILE, 'a', encoding='utf-8') as f:
-        f.write(log_line + "\n")
+
+_log_writer = LogWriter()
+atexit.register(_log_writer.flush)
+
+
+def log(message: str, level: str = "INFO", **fields):
+    """记录一条日志 (非阻塞)；fields 作为结构化字段写入 JSON 记录，如 subject='phy'"""
+    _log_writer.write({'ts': datetime.now().isoformat(timespec='milliseconds'), 'level': level, 'msg': message, **fields})
+
+
+def emit_event(event: str, **data):
+    """向标准输出发送结构化事件 (仅 --events 模式，供管理后台实时展示)"""
+    if _log_writer.json_stdout:
+        _log_writer.write({'event': event, 'ts': datetime.now().isoformat(timespec='milliseconds'), **data})
 
 
 # 支持的语言和考试类型
@@ -151,9 +417,9 @@ def parse_file_links(html: str, subject_key: str) -> List[Dict]:
     
     for link in soup.find_all('a', href=True):
         href = link['href']
-        if 'src.dselib.com' in href and (href.endswith('.pdf') or href.endswith('.mp3')):
+        if href.startswith(FILE_BASE_URL) and (href.endswith('.pdf') or href.endswith('.mp3')):
             try:
-                parts = href.replace('https://src.dselib.com/', '').split('/')
+                parts = href[len(FILE_BASE_URL):].split('/')
                 if len(parts) >= 4:
                     subj, lang, year, filename = parts[0], parts[1], parts[2], parts[3]
                     if subj == subject_key:
@@ -198,7 +464,7 @@ def generate_all_urls(subject_key: str, base_files: List[Dict]) -> List[Dict]:
             year_str = str(year)
             for lang in LANGUAGES:
                 for filename in FILE_PATTERNS:
-                    new_url = f"https://src.dselib.com/{subject_key}/{lang}/{year_str}/{filename}"
+                    new_url = f"{FILE_BASE_URL}{subject_key}/{lang}/{year_str}/{filename}"
                     if new_url not in seen_urls:
                         seen_urls.add(new_url)
                         all_files.append({
@@ -214,25 +480,272 @@ def generate_all_urls(subject_key: str, base_files: List[Dict]) -> List[Dict]:
     return all_files
 
 
+def _part_meta_path(part_path: Path) -> Path:
+    return part_path.with_name(part_path.name + '.json')
+
+
+def read_part_meta(part_path: Path) -> Tuple[int, Dict]:
+    """读取可续传的 .part：返回 (已下载字节数, 元数据)，不可续传时返回 (0, {})"""
+    meta_path = _part_meta_path(part_path)
+    if not part_path.exists() or not meta_path.exists():
+        return 0, {}
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return 0, {}
+    size = part_path.stat().st_size
+    if size == 0 or (meta.get('total') and size >= meta['total']):
+        return 0, {}
+    return size, meta
+
+
+def write_part_meta(part_path: Path, meta: Dict):
+    with open(_part_meta_path(part_path), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+
+def discard_part(part_path: Path):
+    for p in (part_path, _part_meta_path(part_path)):
+        if p.exists():
+            p.unlink()
+
+
+def response_validators(response: aiohttp.ClientResponse, save_path: Path) -> Dict:
+    """提取条件请求所需的校验信息 (size 取落盘后的实际大小，兼容 206 续传)"""
+    return {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'size': save_path.stat().st_size,
+    }
+
+
+def parse_content_range(value: str) -> Tuple[Optional[int], Optional[int]]:
+    """解析 'bytes 100-199/1000' -> (100, 1000)；总长度未知 ('*') 时为 None"""
+    try:
+        _, _, rng = value.partition(' ')
+        span, _, total = rng.partition('/')
+        start = int(span.split('-', 1)[0])
+        return start, (None if total == '*' else int(total))
+    except ValueError:
+        return None, None
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After (秒数或 HTTP 日期)，返回需等待的秒数"""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - datetime.now().timestamp()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), RETRY_AFTER_MAX)
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """第 attempt 次重试前的等待：有 Retry-After 时遵守它，否则全抖动指数退避"""
+    if retry_after is not None:
+        return retry_after + random.uniform(0, RETRY_BASE_DELAY)
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+class AdaptiveLimiter:
+    """AIMD 自适应并发限制 (替代固定大小的 Semaphore)
+
+    - 成功响应且延迟 (EWMA) 不超过最低延迟的 LATENCY_TOLERANCE 倍：limit += 1/limit (约每轮 +1)
+    - 429/5xx/超时：limit *= BACKOFF_FACTOR，同一轮延迟内只减一次
+    - Retry-After：在此之前所有请求暂停发出
+    等待者按 FIFO 获得名额，多科目同时运行时保持公平。
+    """
+
+    def __init__(self, initial: int = INITIAL_CONCURRENT, min_limit: int = MIN_CONCURRENT,
+                 max_limit: int = MAX_CONCURRENT):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.min_latency: Optional[float] = None
+        self.latency: Optional[float] = None
+        self.peak_limit = self.limit
+        self.throttled = 0
+        self._last_decrease = 0.0
+        self._waiters: deque = deque()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+        else:
+            fut = loop.create_future()
+            self._waiters.append(fut)
+            try:
+                await fut
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    self.release()
+                else:
+                    self._waiters.remove(fut)
+                raise
+        # 名额已占用；Retry-After 暂停期间持有名额等待，避免放出新请求
+        pause = self.paused_until - loop.time()
+        if pause > 0:
+            try:
+                await asyncio.sleep(pause)
+            except asyncio.CancelledError:
+                self.release()
+                raise
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            fut = self._waiters.popleft()
+            if not fut.done():
+                self.in_flight += 1
+                fut.set_result(None)
+
+    def on_success(self, latency: float):
+        self.min_latency = latency if self.min_latency is None else min(self.min_latency, latency)
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        if self.latency <= self.min_latency * LATENCY_TOLERANCE:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.peak_limit = max(self.peak_limit, self.limit)
+            self._wake()
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        self.throttled += 1
+        now = asyncio.get_running_loop().time()
+        if retry_after:
+            self.paused_until = max(self.paused_until, now + retry_after)
+        if now - self._last_decrease >= (self.latency or 0.1):
+            self._last_decrease = now
+            self.limit = max(self.min_limit, self.limit * BACKOFF_FACTOR)
+
+
+class ProbeScheduler:
+    """自适应探测调度
+
+    全量探测每科约 3 考试 × 80 年 × 2 语言 × 17 文件名，绝大多数是 404。这里分两轮：
+      1. 页面可见文件 + 每个 (考试, 语言, 年份) 的哨兵文件 (SENTINEL_PATTERNS)
+      2. 第一轮有命中的年份才展开其余文件名
+    各文件名的累计命中率保存在 PROBE_STATS_FILE，展开时按命中率排序，
+    长期零命中的文件名被剪枝。exhaustive=True 时退回全量探测。
+    """
+
+    def __init__(self, exhaustive: bool = EXHAUSTIVE_PROBE):
+        self.exhaustive = exhaustive
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self.pruned: Set[str] = set()
+
+    def load(self):
+        if os.path.exists(PROBE_STATS_FILE):
+            try:
+                with open(PROBE_STATS_FILE, 'r', encoding='utf-8') as f:
+                    self.stats = json.load(f).get('patterns', {})
+            except Exception as e:
+                log(f"[警告] 加载探测统计失败: {e}")
+
+    def save(self):
+        tmp_file = PROBE_STATS_FILE.with_name(PROBE_STATS_FILE.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'patterns': self.stats, 'last_update': datetime.now().isoformat()}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, PROBE_STATS_FILE)
+
+    @staticmethod
+    def group_key(file_info: Dict) -> Tuple[str, str, str]:
+        return (file_info['exam_type'], file_info['lang'], file_info['year'])
+
+    def hit_rate(self, pattern: str) -> float:
+        s = self.stats.get(pattern, {})
+        # 加一平滑：没有数据的文件名排在中间而不是最后
+        return (s.get('hits', 0) + 1) / (s.get('tries', 0) + 2)
+
+    def record(self, file_info: Dict, hit: bool):
+        s = self.stats.setdefault(file_info['filename'], {'tries': 0, 'hits': 0})
+        s['tries'] += 1
+        s['hits'] += int(hit)
+
+    def plan(self, subject_key: str, base_files: List[Dict]) -> Tuple[List[Dict], Dict[Tuple[str, str, str], List[Dict]]]:
+        """返回 (第一轮探测列表, 按年份分组的待展开探测)"""
+        all_files = generate_all_urls(subject_key, base_files)
+        if self.exhaustive:
+            return all_files, {}
+
+        self.pruned = {
+            p for p in FILE_PATTERNS
+            if p not in SENTINEL_PATTERNS
+            and self.stats.get(p, {}).get('tries', 0) >= PRUNE_MIN_TRIES
+            and self.stats.get(p, {}).get('hits', 0) == 0
+        }
+        first_wave = list(base_files)
+        deferred: Dict[Tuple[str, str, str], List[Dict]] = {}
+        for f in all_files[len(base_files):]:
+            if f['filename'] in SENTINEL_PATTERNS:
+                first_wave.append(f)
+            elif f['filename'] not in self.pruned:
+                deferred.setdefault(self.group_key(f), []).append(f)
+        return first_wave, deferred
+
+    def expand(self, deferred: Dict[Tuple[str, str, str], List[Dict]], hit_groups: Set[Tuple[str, str, str]]) -> List[Dict]:
+        """展开第一轮有命中的年份，按文件名历史命中率从高到低排序"""
+        expansion = [f for key in hit_groups for f in deferred.get(key, [])]
+        expansion.sort(key=lambda f: -self.hit_rate(f['filename']))
+        return expansion
+
+
 class Scraper:
-    def __init__(self):
+    def __init__(self, refresh: bool = False, exhaustive: bool = EXHAUSTIVE_PROBE, events: bool = False,
+                 dedup: bool = False):
         self.state = ScraperState()
-        self.semaphore = asyncio.Semaphore(MAX_CONCURRENT)
+        self.scheduler = ProbeScheduler(exhaustive)
+        # refresh 模式：已下载的文件用 If-None-Match / If-Modified-Since 重新校验，只重写有变化的文件
+        self.refresh = refresh
+        self.not_modified_count = 0
+        self.refreshed_count = 0
+        self.bytes_saved = 0
+        # dedup 模式：下载完成的文件收进与索引器共用的内容寻址存储，见 store_blob()
+        self.dedup = dedup
+        self.dedup_bytes = 0
+        # 全局并发预算：所有科目共用，各科目 worker 按 FIFO 排队取得名额，上限随源站状况自适应
+        self.limiter = AdaptiveLimiter()
+        self.retry_count = 0
         self.session: Optional[aiohttp.ClientSession] = None
+        # 本次运行累计 / 各科目本次运行计数，见 counts_for()
         self.downloaded_count = 0
         self.found_count = 0
+        self.bytes_downloaded = 0
+        self.subject_counts: Dict[str, Dict] = {}
+        # --events：定期输出进度事件 (速率、队列深度、各科目完成度)
+        self.events = events
+        self.queues: Dict[str, asyncio.Queue] = {}
         
     async def __aenter__(self):
         connector = aiohttp.TCPConnector(limit=MAX_CONCURRENT, limit_per_host=MAX_CONCURRENT)
         timeout = aiohttp.ClientTimeout(total=TIMEOUT)
         self.session = aiohttp.ClientSession(headers=HEADERS, timeout=timeout, connector=connector)
         self.state.load()
+        self.scheduler.load()
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         if self.session:
             await self.session.close()
-        self.state.save()
+        self.state.compact()
+        self.scheduler.save()
+        await asyncio.to_thread(_log_writer.flush)
 
     async def fetch_subject_page(self, subject_key: str) -> str:
         """获取科目页面HTML"""
@@ -256,77 +769,194 @@ class Scraper:
         # 构建保存路径
         save_path = DOWNLOAD_DIR / file_info['subject'] / file_info['exam_type'] / file_info['lang'] / file_info['year'] / file_info['filename']
 
-        # 已下载跳过
+        part_path = save_path.with_name(save_path.name + '.part')
+
+        # 已下载跳过 (refresh 模式下做条件请求)
         if url in self.state.downloaded_files and save_path.exists():
+            if self.refresh:
+                return await self.refresh_file(file_info, save_path, referer)
             return True
-        # 已失败或已尝试过跳过
-        if url in self.state.failed_urls or url in self.state.seen_urls:
-            return False
+        # 已有永久性结果 (404 等) 的跳过 (留有 .part 的中断下载除外，继续断点续传)；
+        # 暂时性失败不在 seen_urls 中，会再次尝试
+        if url in self.state.seen_urls:
+            if not part_path.exists():
+                return False
+
+        loop = asyncio.get_running_loop()
+        for attempt in range(MAX_RETRIES + 1):
+            retry_after = None
+            try:
+                async with self.limiter:
+                    headers = {**HEADERS, 'Referer': referer}
+                    offset, meta = read_part_meta(part_path)
+                    if offset:
+                        headers['Range'] = f"bytes={offset}-"
+                        # 源文件已变化时服务器会返回完整的 200，而不是拼接到旧内容后面
+                        validator = meta.get('etag') or meta.get('last_modified')
+                        if validator:
+                            headers['If-Range'] = validator
+                    started = loop.time()
+                    async with self.session.get(url, headers=headers) as response:
+                        if response.status in RETRY_STATUSES:
+                            # 限流/服务端错误：降并发，退避后重试
+                            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                            self.limiter.on_throttle(retry_after)
+                            reason = str(response.status)
+                        else:
+                            self.limiter.on_success(loop.time() - started)
+                            if response.status == 416:
+                                # 续传位置无效 (源文件变短等)，丢弃 .part，下次从头下载
+                                discard_part(part_path)
+                                self.state.mark_failed(url, 'partial', subject_key)
+                                return False
+                            if response.status in (200, 206):
+                                content_type = response.headers.get('Content-Type', '')
+                                if 'pdf' in content_type.lower() or 'octet-stream' in content_type.lower():
+                                    md5 = await self.stream_to_file(response, save_path, offset, meta)
 
+                                    self.state.mark_downloaded(url, subject_key, md5, response_validators(response, save_path))
+                                    if self.dedup:
+                                        self.dedup_bytes += store_blob(save_path, md5)
+                                    self.count_download(subject_key, file_info.get('is_probe', False))
+                                    return True
+                                # 不是试卷文件 (如返回 HTML 页面)，按永久性结果记录
+                                self.state.mark_failed(url, 'content-type', subject_key)
+                                return False
+
+                            # 404 及其它状态码也算“已尝试/已见过”，避免无限重试拖慢速度
+                            self.state.mark_failed(url, '404' if response.status == 404 else str(response.status), subject_key)
+                            return False
+            except (asyncio.TimeoutError, aiohttp.ClientError):
+                # 超时/连接中断：降并发后重试；已写入部分内容的下次请求会带 Range 续传
+                self.limiter.on_throttle()
+                reason = 'partial' if part_path.exists() else 'exception'
+            except Exception:
+                self.state.mark_failed(url, 'partial' if part_path.exists() else 'exception', subject_key)
+                return False
+
+            if attempt < MAX_RETRIES:
+                self.retry_count += 1
+                await asyncio.sleep(backoff_delay(attempt, retry_after))
+
+        # 重试耗尽，记录为暂时性失败，下次运行重试；partial 的下次运行时续传
+        self.state.mark_failed(url, reason, subject_key)
+        return False
+
+    def counts_for(self, subject_key: Optional[str]) -> Dict:
+        """科目本次运行的计数: downloaded / found / probed (已处理 URL) / planned (计划 URL) / completed"""
+        return self.subject_counts.setdefault(
+            subject_key, {'downloaded': 0, 'found': 0, 'probed': 0, 'planned': 0, 'completed': False})
+
+    def count_download(self, subject_key: Optional[str], found: bool):
+        counts = self.counts_for(subject_key)
+        counts['downloaded'] += 1
+        self.downloaded_count += 1
+        if found:
+            counts['found'] += 1
+            self.found_count += 1
+
+    async def refresh_file(self, file_info: Dict, save_path: Path, referer: str) -> bool:
+        """条件 GET 重新校验已下载文件
+
+        304 不传输正文，计入节省的字节数；200 时先下载到临时文件，md5 与本地不同才替换。
+        没有保存过 ETag/Last-Modified 的旧文件，用本地文件 mtime 作为 If-Modified-Since。
+        """
+        url = file_info['url']
+        validators = self.state.validators.get(url, {})
+        local_size = save_path.stat().st_size
+        headers = {**HEADERS, 'Referer': referer}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        headers['If-Modified-Since'] = validators.get('last_modified') or formatdate(save_path.stat().st_mtime, usegmt=True)
+
+        new_path = save_path.with_name(save_path.name + '.new')
         try:
-            async with self.semaphore:
-                await asyncio.sleep(random.uniform(MIN_DELAY, MAX_DELAY))
-                headers = {**HEADERS, 'Referer': referer}
+            async with self.limiter:
+                started = asyncio.get_running_loop().time()
                 async with self.session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        content_type = response.headers.get('Content-Type', '')
-                        if 'pdf' in content_type.lower() or 'octet-stream' in content_type.lower():
-                            save_path.parent.mkdir(parents=True, exist_ok=True)
-                            content = await response.read()
-                            async with aiofiles.open(save_path, 'wb') as f:
-                                await f.write(content)
-
-                            self.state.downloaded_files.add(url)
-                            self.state.seen_urls.add(url)
-                            self.downloaded_count += 1
-                            if file_info.get('is_probe'):
-                                self.found_count += 1
-
-                            # 累计进度（subject_key 可能为空，做保护）
-                            if subject_key:
-                                self.state._ensure_subject_progress(subject_key)
-                                p = self.state.progress[subject_key]
-                                p['downloaded_total'] = int(p.get('downloaded_total', 0)) + 1
-                                p['seen_total'] = int(p.get('seen_total', 0)) + 1
-                                p['timestamp'] = datetime.now().isoformat()
-
-                            return True
-
-                    elif response.status == 404:
-                        self.state.failed_urls[url] = '404'
-                        self.state.seen_urls.add(url)
-                        if subject_key:
-                            self.state._ensure_subject_progress(subject_key)
-                            p = self.state.progress[subject_key]
-                            p['failed_total'] = int(p.get('failed_total', 0)) + 1
-                            p['seen_total'] = int(p.get('seen_total', 0)) + 1
-                            p['timestamp'] = datetime.now().isoformat()
-                        return False
-
+                    if response.status in RETRY_STATUSES:
+                        self.limiter.on_throttle(parse_retry_after(response.headers.get('Retry-After')))
+                        return True
+                    self.limiter.on_success(asyncio.get_running_loop().time() - started)
+                    if response.status == 304:
+                        self.not_modified_count += 1
+                        self.bytes_saved += validators.get('size') or local_size
+                        return True
+                    if response.status != 200:
+                        return True
+                    md5 = await self.stream_to_file(response, new_path)
+                    old_md5 = self.state.file_md5.get(url) or await asyncio.to_thread(file_md5, save_path)
+                    if md5 == old_md5:
+                        # 源站没有提供有效校验信息，但内容未变：保留原文件 (mtime 不变)
+                        new_path.unlink()
                     else:
-                        # 其它状态码也算“已尝试/已见过”，避免无限重试拖慢速度
-                        self.state.failed_urls[url] = str(response.status)
-                        self.state.seen_urls.add(url)
-                        if subject_key:
-                            self.state._ensure_subject_progress(subject_key)
-                            p = self.state.progress[subject_key]
-                            p['failed_total'] = int(p.get('failed_total', 0)) + 1
-                            p['seen_total'] = int(p.get('seen_total', 0)) + 1
-                            p['timestamp'] = datetime.now().isoformat()
-                        return False
-        except Exception:
-            # 异常也记录为失败/已见过（可按需改为不记录，但会导致重启后重复尝试）
-            self.state.failed_urls[url] = 'exception'
-            self.state.seen_urls.add(url)
-            if subject_key:
-                self.state._ensure_subject_progress(subject_key)
-                p = self.state.progress[subject_key]
-                p['failed_total'] = int(p.get('failed_total', 0)) + 1
-                p['seen_total'] = int(p.get('seen_total', 0)) + 1
-                p['timestamp'] = datetime.now().isoformat()
-            return False
+                        os.replace(new_path, save_path)
+                        self.refreshed_count += 1
+                        log(f"[刷新] 已更新: {url}")
+                    self.state.mark_refreshed(url, md5, response_validators(response, save_path))
+                    if self.dedup:
+                        self.dedup_bytes += store_blob(save_path, md5)
+        except Exception as e:
+            discard_part(new_path.with_name(new_path.name + '.part'))
+            if new_path.exists():
+                new_path.unlink()
+            log(f"[刷新] 校验失败: {url} - {e}", "WARN")
+        return True
 
-        return False
+    async def stream_to_file(self, response: aiohttp.ClientResponse, save_path: Path,
+                             offset: int = 0, meta: Optional[Dict] = None) -> str:
+        """分块流式写入 save_path.part，边写边算 md5，完整后原子改名为 save_path
+
+        内存占用只与 DOWNLOAD_CHUNK_SIZE 有关，最终路径上不会出现截断的文件。
+        - 206 响应：校验 Content-Range 起点与总长度后追加到已有 .part (前缀只在本地读一遍算 md5)
+        - 200 响应：从头写入，并在 .part.json 中记录 ETag / Last-Modified / 总长度供续传校验
+        中途失败时，若服务器支持 Range 则保留 .part 以便续传，否则删除。
+        """
+        save_path.parent.mkdir(parents=True, exist_ok=True)
+        part_path = save_path.with_name(save_path.name + '.part')
+        hash_md5 = hashlib.md5()
+
+        if response.status == 206:
+            meta = meta or {}
+            start, total = parse_content_range(response.headers.get('Content-Range', ''))
+            etag = response.headers.get('ETag')
+            if (start != offset or (meta.get('total') and total != meta['total'])
+                    or (etag and meta.get('etag') and etag != meta['etag'])):
+                discard_part(part_path)
+                raise aiohttp.ClientPayloadError(f"续传校验失败: Content-Range={response.headers.get('Content-Range')}, ETag={etag}")
+            async with aiofiles.open(part_path, 'rb') as f:
+                while chunk := await f.read(DOWNLOAD_CHUNK_SIZE):
+                    hash_md5.update(chunk)
+            mode = 'ab'
+            resumable = True
+        else:
+            offset = 0
+            total = response.content_length
+            resumable = response.headers.get('Accept-Ranges', '').lower() == 'bytes'
+            write_part_meta(part_path, {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'total': total,
+            })
+            mode = 'wb'
+
+        received = offset
+        try:
+            async with aiofiles.open(part_path, mode) as f:
+                async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    hash_md5.update(chunk)
+                    received += len(chunk)
+                    self.bytes_downloaded += len(chunk)
+                    await f.write(chunk)
+            if total is not None and received != total:
+                raise aiohttp.ClientPayloadError(f"长度不符: 收到 {received} / 期望 {total} 字节")
+            os.replace(part_path, save_path)
+            discard_part(part_path)
+        except BaseException:
+            if not resumable or received == 0 or (total is not None and received > total):
+                discard_part(part_path)
+            raise
+        return hash_md5.hexdigest()
 
     async def scrape_subject(self, subject_key: str, subject_info: Dict):
         """爬取单个科目 - 高速并发版"""
@@ -334,8 +964,7 @@ class Scraper:
         log(f"开始爬取: {subject_info['name']} ({subject_info['name_zh']})")
         log(f"{'='*50}")
 
-        self.downloaded_count = 0
-        self.found_count = 0
+        counts = self.counts_for(subject_key)
 
         # Step 1: 获取科目页面
         referer = f"{BASE_URL}/{subject_key}"
@@ -344,77 +973,229 @@ class Scraper:
             log(f"[失败] 无法获取科目页面: {subject_key}", "ERROR")
             return
 
-        # Step 2: 解析页面 + 生成全量URL
+        # Step 2: 解析页面 + 生成探测计划 (哨兵优先，命中的年份再展开)
         base_files = parse_file_links(html, subject_key)
         log(f"[解析] 页面可见文件: {len(base_files)} 个")
 
-        all_files = generate_all_urls(subject_key, base_files)
-        log(f"[全量] 总探测URL: {len(all_files)} 个")
+        first_wave, deferred = self.scheduler.plan(subject_key, base_files)
+        planned = len(first_wave) + sum(len(v) for v in deferred.values())
+        if self.scheduler.exhaustive:
+            log(f"[全量] 总探测URL: {len(first_wave)} 个")
+        else:
+            log(f"[调度] 第一轮 {len(first_wave)} 个 (页面文件 + 哨兵)，待展开 {planned - len(first_wave)} 个"
+                f"{f'，已剪枝文件名: {sorted(self.scheduler.pruned)}' if self.scheduler.pruned else ''}")
 
         # 初始化/更新 progress（断点续跑不会丢）
-        self.state._ensure_subject_progress(subject_key, total_urls=len(all_files))
+        total_urls = len(first_wave)
+        counts['planned'] = total_urls
+        self.state._ensure_subject_progress(subject_key, total_urls=total_urls)
         # 确保 completed 重置为 False（如果上次未完全成功但误标记）
         self.state.progress[subject_key]['completed'] = False
         self.state.progress[subject_key]['timestamp'] = datetime.now().isoformat()
         self.state.save()
 
         # Step 3: 分批并发下载
-        total = len(all_files)
-        for i in range(0, total, BATCH_SIZE):
-            batch = all_files[i:i + BATCH_SIZE]
-            tasks = [self.download_file(f, referer) for f in batch]
-            await asyncio.gather(*tasks)
+        hit_groups = await self.probe_files(subject_key, first_wave, referer)
+        if deferred:
+            expansion = self.scheduler.expand(deferred, hit_groups)
+            log(f"[调度] {len(hit_groups)} 个年份有命中，展开 {len(expansion)} 个 (跳过 {planned - len(first_wave) - len(expansion)} 个)")
+            total_urls += len(expansion)
+            counts['planned'] = total_urls
+            self.state._ensure_subject_progress(subject_key, total_urls=total_urls)
+            await self.probe_files(subject_key, expansion, referer)
 
-            # 保存进度
-            self.state.save()
-            progress = min(i + BATCH_SIZE, total)
-            log(f"[进度] {progress}/{total} ({progress/total*100:.1f}%) - 本次运行下载 {self.downloaded_count}, 新发现 {self.found_count}")
-
-        log(f"完成 {subject_info['name']}: 本次运行下载 {self.downloaded_count} 个文件 (新发现 {self.found_count})")
+        log(f"完成 {subject_info['name']}: 本次运行下载 {counts['downloaded']} 个文件 (新发现 {counts['found']})",
+            subject=subject_key, downloaded=counts['downloaded'], found=counts['found'])
 
         # 标记完成，同时保留累计字段
-        self.state._ensure_subject_progress(subject_key, total_urls=len(all_files))
+        self.state._ensure_subject_progress(subject_key, total_urls=total_urls)
         self.state.progress[subject_key]['completed'] = True
+        counts['completed'] = True
         # 兼容旧前端字段：downloaded/found 仍填“本次运行”统计
-        self.state.progress[subject_key]['downloaded'] = self.downloaded_count
-        self.state.progress[subject_key]['found'] = self.found_count
+        self.state.progress[subject_key]['downloaded'] = counts['downloaded']
+        self.state.progress[subject_key]['found'] = counts['found']
         self.state.progress[subject_key]['timestamp'] = datetime.now().isoformat()
         self.state.save()
+        self.scheduler.save()
+
+    async def probe_files(self, subject_key: str, files: List[Dict], referer: str) -> Set[Tuple[str, str, str]]:
+        """常驻 worker 池并发下载/探测，返回有命中的 (考试, 语言, 年份) 分组
+
+        WORKERS 个协程从有界队列取任务，单个慢文件只占住一个 worker，其余连接持续工作；
+        状态按 STATE_FLUSH_INTERVAL 定时落盘，而不是每批一次。
+        多个科目同时运行时，实际并发仍受全局 self.limiter 限制。
+        """
+        hit_groups: Set[Tuple[str, str, str]] = set()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        loop = asyncio.get_running_loop()
+        total = len(files)
+        done = 0
+        counts = self.counts_for(subject_key)
+        last_flush = loop.time()
+
+        def flush():
+            nonlocal last_flush
+            last_flush = loop.time()
+            self.state.save()
+            log(f"[进度] {subject_key} {done}/{total} ({done/total*100:.1f}%) - 本次运行下载 {counts['downloaded']}, 新发现 {counts['found']}"
+                f", 并发 {int(self.limiter.limit)}", subject=subject_key, done=done, total=total)
+
+        async def worker():
+            nonlocal done
+            while True:
+                f = await queue.get()
+                if f is None:
+                    return
+                fresh = f['url'] not in self.state.seen_urls
+                hit = await self.download_file(f, referer)
+                if hit:
+                    hit_groups.add(ProbeScheduler.group_key(f))
+                if fresh and f.get('is_probe'):
+                    self.scheduler.record(f, hit)
+                done += 1
+                counts['probed'] += 1
+                if loop.time() - last_flush >= STATE_FLUSH_INTERVAL:
+                    flush()
+
+        if not files:
+            return hit_groups
+        workers = [asyncio.create_task(worker()) for _ in range(min(WORKERS, total))]
+        self.queues[subject_key] = queue
+        try:
+            for f in files:
+                await queue.put(f)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            self.queues.pop(subject_key, None)
+            for w in workers:
+                w.cancel()
+        flush()
+        return hit_groups
         
+    def emit_progress(self, elapsed: float, files_delta: int, bytes_delta: int, probed_delta: int = 0):
+        emit_event(
+            'progress',
+            files_per_sec=_rate(files_delta, elapsed),
+            bytes_per_sec=_rate(bytes_delta, elapsed),
+            urls_per_sec=_rate(probed_delta, elapsed),
+            downloaded=self.downloaded_count,
+            bytes=self.bytes_downloaded,
+            queue_depth=sum(q.qsize() for q in self.queues.values()),
+            in_flight=self.limiter.in_flight,
+            concurrency=round(self.limiter.limit, 1),
+            retries=self.retry_count,
+            subjects={k: dict(v) for k, v in self.subject_counts.items()},
+        )
+
+    async def report_progress(self):
+        """每 PROGRESS_INTERVAL 秒输出一次进度事件 (只读内存计数，不读磁盘)"""
+        loop = asyncio.get_running_loop()
+        last = (loop.time(), self.downloaded_count, self.bytes_downloaded, 0)
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            probed = sum(c['probed'] for c in self.subject_counts.values())
+            now = (loop.time(), self.downloaded_count, self.bytes_downloaded, probed)
+            self.emit_progress(now[0] - last[0], now[1] - last[1], now[2] - last[2], now[3] - last[3])
+            last = now
+
     async def run(self, subjects: List[str] = None):
         """主运行函数"""
         log("=" * 60)
         log("DSE Library Scraper v4 启动 (高速并发版)")
         log(f"目标: {BASE_URL}")
-        log(f"并发数: {MAX_CONCURRENT}, 批量大小: {BATCH_SIZE}")
+        log(f"并发数: 自适应 {INITIAL_CONCURRENT} ({MIN_CONCURRENT}-{MAX_CONCURRENT}), 下载协程: {WORKERS}")
         log("=" * 60)
         
         os.makedirs(DOWNLOAD_DIR, exist_ok=True)
         
-        target_subjects = subjects or list(SUBJECTS.keys())
-        
-        for subject_key in target_subjects:
+        target_subjects = []
+        for subject_key in subjects or list(SUBJECTS.keys()):
             if subject_key not in SUBJECTS:
                 log(f"未知科目: {subject_key}", "WARN")
                 continue
-                
-            await self.scrape_subject(subject_key, SUBJECTS[subject_key])
-            
+            target_subjects.append(subject_key)
+
+        # 各科目同时爬取，共享全局并发预算；总耗时约等于最慢科目而不是各科之和
+        reporter = asyncio.create_task(self.report_progress()) if self.events else None
+        try:
+            results = await asyncio.gather(
+                *(self.scrape_subject(k, SUBJECTS[k]) for k in target_subjects),
+                return_exceptions=True,
+            )
+        finally:
+            if reporter:
+                reporter.cancel()
+                self.emit_progress(0.0, 0, 0)
+        for subject_key, result in zip(target_subjects, results):
+            if isinstance(result, Exception):
+                log(f"[失败] 科目 {subject_key} 异常中止: {result!r}", "ERROR")
+        self.state.save()
+
         log("\n" + "=" * 60)
         log("爬取完成!")
+        for subject_key in target_subjects:
+            counts = self.subject_counts.get(subject_key, {'downloaded': 0, 'found': 0})
+            log(f"  {subject_key}: 本次运行下载 {counts['downloaded']} (新发现 {counts['found']})")
         log(f"总计下载: {len(self.state.downloaded_files)} 文件")
         log(f"失败数量: {len(self.state.failed_urls)}")
+        if self.dedup_bytes:
+            log(f"内容去重: 本次节省 {self.dedup_bytes / 1024 / 1024:.2f} MB")
+        if self.dedup:
+            # --refresh 用 os.replace 换掉旧文件后，旧内容的 blob 只剩存储里这一个链接
+            pruned = prune_store()
+            if pruned:
+                log(f"内容去重: 清理无引用 blob {pruned} 个")
+        log(f"并发控制: 结束时 {int(self.limiter.limit)}, 峰值 {int(self.limiter.peak_limit)}, 限流/错误 {self.limiter.throttled} 次, 重试 {self.retry_count} 次")
+        if self.refresh:
+            log(f"刷新结果: 未变化 {self.not_modified_count} (节省 {self.bytes_saved / 1024 / 1024:.2f} MB), 已更新 {self.refreshed_count}")
         log("=" * 60)
 
 
-async def main():
-    import sys
-    
+def store_blob(path: Path, md5: str) -> int:
+    """把已下载文件收进共享的内容寻址存储 (见 blob_store)，返回因去重省下的字节数；失败时保留独立副本"""
+    try:
+        return link_into_store(path, md5)
+    except OSError as e:
+        log(f"[去重] 跳过 {path}: {e}", "WARN")
+        return 0
+
+
+def _rate(delta: float, elapsed: float) -> float:
+    return round(delta / elapsed, 2) if elapsed > 0 else 0.0
+
+
+def file_md5(path: Path) -> str:
+    hash_md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+            hash_md5.update(chunk)
+    return hash_md5.hexdigest()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="DSE Library 爬虫")
     # 可以指定要爬取的科目，例如: python scraper.py phy chem bio
-    subjects = sys.argv[1:] if len(sys.argv) > 1 else None
+    parser.add_argument('subjects', nargs='*', help="要爬取的科目 (默认全部)")
+    parser.add_argument('--refresh', action='store_true',
+                        help="对已下载文件发送条件请求 (ETag/Last-Modified)，只重新下载源站有变化的文件")
+    parser.add_argument('--exhaustive', action='store_true', default=EXHAUSTIVE_PROBE,
+                        help="关闭哨兵调度与剪枝，探测全部 年份 × 语言 × 文件名 组合")
+    parser.add_argument('--events', action='store_true',
+                        help="标准输出改为 JSON Lines，并定期输出进度事件 (供管理后台读取)")
+    parser.add_argument('--dedup', action='store_true',
+                        help="内容相同的文件硬链接到部署目录之外的共享存储 (与索引器 --dedup 共用) 下同一个 blob，只占一份磁盘空间")
+    return parser.parse_args(argv)
+
+
+async def main():
+    args = parse_args()
+    _log_writer.json_stdout = args.events
     
-    async with Scraper() as scraper:
-        await scraper.run(subjects)
+    async with Scraper(refresh=args.refresh, exhaustive=args.exhaustive, events=args.events,
+                       dedup=args.dedup) as scraper:
+        await scraper.run(args.subjects or None)
 
 
 if __name__ == "__main__":
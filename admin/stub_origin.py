@@ -0,0 +1,197 @@
+"""DSE Library 本地源站模拟
+替代 dselib.com / src.dselib.com，供爬虫基准测试与联调使用，不访问真实源站。
+
+- GET /{subject}                       科目页面 (含部分文件链接)
+- GET /files/{subject}/{lang}/{year}/{file}  文件；是否存在由路径哈希决定，结果稳定可复现
+
+限流模拟：同时处理的请求超过 --capacity 时返回 429 (带 Retry-After)，
+另有 --error-ratio 比例的请求随机返回 503，用于检验爬虫的自适应并发与重试。
+
+断点续传：支持 Range / If-Range (206 + Content-Range)；--cut-after N 让每个文件的第一次完整响应
+在发出 N 字节正文后断开连接，用于检验 .part 续传；revision 加一模拟源站更新了文件 (内容与 ETag 随之改变)。
+
+用法:
+    python stub_origin.py --port 8090 --latency 0.02 --exist-ratio 0.1
+    然后将 scraper.BASE_URL / FILE_BASE_URL 指向 http://127.0.0.1:8090 与 http://127.0.0.1:8090/files/
+"""
+
+import asyncio
+import hashlib
+import random
+import argparse
+from typing import Optional, Tuple
+from aiohttp import web
+
+HOST = '127.0.0.1'
+PORT = 8090
+
+
+class StubOrigin:
+    """可配置延迟、404 比例、文件大小与慢文件比例的模拟源站"""
+
+    def __init__(self, latency: float = 0.02, latency_404: Optional[float] = None,
+                 exist_ratio: float = 0.1, file_size: int = 64 * 1024,
+                 slow_ratio: float = 0.0, slow_delay: float = 1.0,
+                 capacity: int = 0, retry_after: float = 1.0, error_ratio: float = 0.0, seed: int = 0,
+                 cut_after: int = 0):
+        self.latency = latency
+        self.latency_404 = latency if latency_404 is None else latency_404
+        self.exist_ratio = exist_ratio
+        self.file_size = file_size
+        self.slow_ratio = slow_ratio
+        self.slow_delay = slow_delay
+        self.capacity = capacity  # 0 表示不限流
+        self.retry_after = retry_after
+        self.error_ratio = error_ratio
+        self.cut_after = cut_after  # 0 表示不断开
+        self.cut_paths: set = set()
+        self.revision = 0  # 文件内容版本，改变后 If-Range 不再匹配
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.bytes_sent = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.throttled = 0
+        self.errors = 0
+        # 每个文件请求的记录: {'path', 'range', 'if_range', 'status', 'bytes'}
+        self.file_log: list = []
+        self.runner: Optional[web.AppRunner] = None
+        self.base_url = ''
+
+    def _bucket(self, path: str, salt: str) -> float:
+        """路径哈希映射到 [0, 1)，用于稳定地决定文件是否存在/是否慢"""
+        digest = hashlib.md5(f"{salt}:{path}".encode('utf-8')).digest()
+        return int.from_bytes(digest[:4], 'big') / 2 ** 32
+
+    def exists(self, path: str) -> bool:
+        return self._bucket(path, 'exist') < self.exist_ratio
+
+    def body(self, path: str) -> bytes:
+        key = f"{path}#{self.revision}" if self.revision else path
+        seed = hashlib.md5(key.encode('utf-8')).digest()
+        return (seed * (self.file_size // len(seed) + 1))[:self.file_size]
+
+    async def handle_page(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return web.Response(text="<html><body></body></html>", content_type='text/html')
+
+    async def handle_file(self, request: web.Request) -> web.StreamResponse:
+        self.requests += 1
+        if self.capacity and self.in_flight >= self.capacity:
+            self.throttled += 1
+            return web.Response(status=429, headers={'Retry-After': f"{self.retry_after:g}"})
+        if self.error_ratio and self.rng.random() < self.error_ratio:
+            self.errors += 1
+            await asyncio.sleep(self.latency)
+            return web.Response(status=503)
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return await self.serve_file(request, request.match_info['path'])
+        finally:
+            self.in_flight -= 1
+
+    @staticmethod
+    def parse_range(value: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+        """解析单段 'bytes=start-[end]'，返回 [start, end) ；无法识别时返回 None (按完整响应处理)"""
+        if not value or not value.startswith('bytes=') or ',' in value:
+            return None
+        start, _, end = value[len('bytes='):].partition('-')
+        try:
+            if not start:
+                return max(size - int(end), 0), size
+            return int(start), min(int(end) + 1, size) if end else size
+        except ValueError:
+            return None
+
+    async def serve_file(self, request: web.Request, path: str) -> web.StreamResponse:
+        record = {'path': path, 'range': request.headers.get('Range'),
+                  'if_range': request.headers.get('If-Range'), 'status': 404, 'bytes': 0}
+        self.file_log.append(record)
+        if not self.exists(path):
+            await asyncio.sleep(self.latency_404)
+            return web.Response(status=404)
+        await asyncio.sleep(self.latency)
+        if self._bucket(path, 'slow') < self.slow_ratio:
+            await asyncio.sleep(self.slow_delay)
+        body = self.body(path)
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        headers = {'Content-Type': 'application/pdf', 'Accept-Ranges': 'bytes', 'ETag': etag}
+
+        # If-Range 与当前 ETag 不符时忽略 Range，返回完整的 200
+        span = self.parse_range(record['range'], len(body))
+        if span is not None and record['if_range'] not in (None, etag):
+            span = None
+        if span is not None:
+            start, end = span
+            if start >= len(body) or start >= end:
+                record['status'] = 416
+                return web.Response(status=416, headers={'Content-Range': f"bytes */{len(body)}"})
+            headers['Content-Range'] = f"bytes {start}-{end - 1}/{len(body)}"
+            status, payload = 206, body[start:end]
+        else:
+            status, payload = 200, body
+        record['status'] = status
+
+        cut = status == 200 and self.cut_after and path not in self.cut_paths and self.cut_after < len(payload)
+        if not cut:
+            record['bytes'] = len(payload)
+            self.bytes_sent += len(payload)
+            return web.Response(status=status, body=payload, headers=headers)
+
+        # 声明完整长度，只发出前 cut_after 字节后断开，模拟下载中途连接中断
+        self.cut_paths.add(path)
+        response = web.StreamResponse(status=status, headers=headers)
+        response.content_length = len(payload)
+        await response.prepare(request)
+        await response.write(payload[:self.cut_after])
+        record['bytes'] = self.cut_after
+        self.bytes_sent += self.cut_after
+        request.transport.close()
+        return response
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/files/{path:.+}', self.handle_file)
+        app.router.add_get('/{subject}', self.handle_page)
+        return app
+
+    async def start(self, host: str = HOST, port: int = 0) -> str:
+        """在当前事件循环中启动，port=0 时自动分配端口；返回 base_url"""
+        self.runner = web.AppRunner(self.create_app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}"
+        return self.base_url
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="DSE Library 本地源站模拟")
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--latency', type=float, default=0.02, help="每个请求的延迟 (秒)")
+    parser.add_argument('--latency-404', type=float, default=None, help="404 响应的延迟 (默认同 --latency)")
+    parser.add_argument('--exist-ratio', type=float, default=0.1, help="探测路径中存在文件的比例")
+    parser.add_argument('--file-size', type=int, default=64 * 1024, help="文件大小 (字节)")
+    parser.add_argument('--slow-ratio', type=float, default=0.0, help="慢文件比例")
+    parser.add_argument('--slow-delay', type=float, default=1.0, help="慢文件额外延迟 (秒)")
+    parser.add_argument('--capacity', type=int, default=0, help="同时处理请求数上限，超出返回 429 (0 不限)")
+    parser.add_argument('--retry-after', type=float, default=1.0, help="429 响应的 Retry-After (秒)")
+    parser.add_argument('--error-ratio', type=float, default=0.0, help="随机返回 503 的比例")
+    parser.add_argument('--cut-after', type=int, default=0, help="每个文件的第一次完整响应发出 N 字节后断开 (0 不断开)")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    origin = StubOrigin(args.latency, args.latency_404, args.exist_ratio, args.file_size,
+                        args.slow_ratio, args.slow_delay, args.capacity, args.retry_after, args.error_ratio,
+                        cut_after=args.cut_after)
+    print(f"本地源站: http://{HOST}:{args.port}  (文件前缀 http://{HOST}:{args.port}/files/)")
+    web.run_app(origin.create_app(), host=HOST, port=args.port, print=None)
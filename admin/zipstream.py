@@ -0,0 +1,141 @@
+"""流式 ZIP 打包 (STORE 模式)
+PDF/MP3 本身已压缩，不再做 deflate；边读边输出，内存占用只与 CHUNK_SIZE 有关，不产生临时文件。
+
+- 每个条目使用数据描述符 (flag bit 3)，CRC32 在读取文件时顺带计算，无需预先扫描
+- 各文件大小来自 stat，打包前即可算出 ZIP 总长度 (可作为 Content-Length)
+- 偏移或数量超出 ZIP32 上限时自动写 ZIP64 记录，支持多 GB 的选择
+- 条目顺序与 mtime 由调用方决定，相同输入产生逐字节相同的输出
+"""
+
+import os
+import time
+import zlib
+import struct
+from typing import Iterator, List, NamedTuple, Optional
+
+CHUNK_SIZE = 1024 * 1024
+ZIP32_LIMIT = 0xFFFFFFFF
+ZIP16_LIMIT = 0xFFFF
+FLAGS = 0x0008 | 0x0800  # 数据描述符 + UTF-8 文件名
+# 固定时间戳 (1980-01-01)，用于需要可复现输出的场景
+EPOCH_1980 = time.mktime((1980, 1, 1, 0, 0, 0, 0, 0, -1))
+
+
+class ZipEntry(NamedTuple):
+    arcname: str
+    path: str
+    size: int
+    mtime: float
+
+
+def dos_datetime(mtime: float):
+    t = time.localtime(max(mtime, EPOCH_1980))
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+class ZipStream:
+    """按给定条目生成 ZIP 字节流
+
+    用法:
+        stream = ZipStream([ZipEntry('dse/eng/2012/p1.pdf', path, size, mtime), ...])
+        length = stream.total_size()
+        for chunk in stream.chunks():
+            ...
+    """
+
+    def __init__(self, entries: List[ZipEntry]):
+        self.entries = entries
+
+    @staticmethod
+    def _large(entry: ZipEntry) -> bool:
+        return entry.size >= ZIP32_LIMIT
+
+    def _local_header(self, entry: ZipEntry, name: bytes) -> bytes:
+        dos_time, dos_date = dos_datetime(entry.mtime)
+        if self._large(entry):
+            extra = struct.pack('<HHQQ', 0x0001, 16, 0, 0)
+            return struct.pack('<IHHHHHIIIHH', 0x04034b50, 45, FLAGS, 0, dos_time, dos_date,
+                               0, ZIP32_LIMIT, ZIP32_LIMIT, len(name), len(extra)) + name + extra
+        return struct.pack('<IHHHHHIIIHH', 0x04034b50, 20, FLAGS, 0, dos_time, dos_date,
+                           0, 0, 0, len(name), 0) + name
+
+    def _descriptor(self, entry: ZipEntry, crc: int) -> bytes:
+        if self._large(entry):
+            return struct.pack('<IIQQ', 0x08074b50, crc, entry.size, entry.size)
+        return struct.pack('<IIII', 0x08074b50, crc, entry.size, entry.size)
+
+    def _central_header(self, entry: ZipEntry, name: bytes, crc: int, offset: int) -> bytes:
+        dos_time, dos_date = dos_datetime(entry.mtime)
+        zip64_fields = []
+        size32 = entry.size
+        offset32 = offset
+        if self._large(entry):
+            zip64_fields += [entry.size, entry.size]
+            size32 = ZIP32_LIMIT
+        if offset >= ZIP32_LIMIT:
+            zip64_fields.append(offset)
+            offset32 = ZIP32_LIMIT
+        extra = struct.pack(f'<HH{len(zip64_fields)}Q', 0x0001, 8 * len(zip64_fields), *zip64_fields) if zip64_fields else b''
+        version = 45 if zip64_fields else 20
+        return struct.pack('<IHHHHHHIIIHHHHHII', 0x02014b50, (3 << 8) | version, version, FLAGS, 0,
+                           dos_time, dos_date, crc, size32, size32, len(name), len(extra), 0, 0, 0,
+                           0o100644 << 16, offset32) + name + extra
+
+    def _end_records(self, count: int, cd_offset: int, cd_size: int) -> bytes:
+        out = b''
+        if count >= ZIP16_LIMIT or cd_offset >= ZIP32_LIMIT or cd_size >= ZIP32_LIMIT:
+            zip64_offset = cd_offset + cd_size
+            out += struct.pack('<IQHHIIQQQQ', 0x06064b50, 44, 45, 45, 0, 0, count, count, cd_size, cd_offset)
+            out += struct.pack('<IIQI', 0x07064b50, 0, zip64_offset, 1)
+        out += struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, min(count, ZIP16_LIMIT), min(count, ZIP16_LIMIT),
+                           min(cd_size, ZIP32_LIMIT), min(cd_offset, ZIP32_LIMIT), 0)
+        return out
+
+    def total_size(self) -> int:
+        """ZIP 总字节数 (与 chunks() 实际输出一致)"""
+        offset = 0
+        cd_size = 0
+        for entry in self.entries:
+            name = entry.arcname.encode('utf-8')
+            header = len(self._local_header(entry, name))
+            cd_size += len(self._central_header(entry, name, 0, offset))
+            offset += header + entry.size + len(self._descriptor(entry, 0))
+        return offset + cd_size + len(self._end_records(len(self.entries), offset, cd_size))
+
+    def chunks(self) -> Iterator[bytes]:
+        """逐块产出 ZIP 内容；文件在打包过程中被修改导致大小不符时抛出 IOError"""
+        offset = 0
+        central = []
+        for entry in self.entries:
+            name = entry.arcname.encode('utf-8')
+            header = self._local_header(entry, name)
+            yield header
+            crc = 0
+            remaining = entry.size
+            with open(entry.path, 'rb') as f:
+                while remaining:
+                    chunk = f.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise IOError(f"文件在打包过程中变短: {entry.path}")
+                    crc = zlib.crc32(chunk, crc)
+                    remaining -= len(chunk)
+                    yield chunk
+            descriptor = self._descriptor(entry, crc)
+            yield descriptor
+            central.append(self._central_header(entry, name, crc, offset))
+            offset += len(header) + entry.size + len(descriptor)
+        cd = b''.join(central)
+        yield cd
+        yield self._end_records(len(self.entries), offset, len(cd))
+
+
+def entries_from_files(files, arc_root: str, mtime: Optional[float] = None) -> List[ZipEntry]:
+    """由文件路径列表生成条目，arcname 为相对 arc_root 的路径；mtime 不为 None 时统一使用该时间"""
+    entries = []
+    for path in files:
+        st = os.stat(path)
+        arcname = os.path.relpath(path, arc_root).replace(os.sep, '/')
+        entries.append(ZipEntry(arcname, path, st.st_size, st.st_mtime if mtime is None else mtime))
+    return entries
@@ -1,9 +1,10 @@
-const CACHE_NAME = 'dse-lib-v1.0.0';
+const CACHE_NAME = 'dse-lib-v1.1.0';
+const INDEX_URL = '/public/data/index.json';
 const urlsToCache = [
   '/',
   '/index.html',
   '/manifest.json',
-  '/public/data/index.json',
+  INDEX_URL,
   'https://unpkg.com/vue@3/dist/vue.global.prod.js',
   'https://cdn.tailwindcss.com',
   'https://cdnjs.cloudflare.com/ajax/libs/jszip/3.10.1/jszip.min.js',
@@ -27,6 +28,49 @@ self.addEventListener('install', function(event) {
 
 // 拦截网络请求
 self.addEventListener('fetch', function(event) {
+  const url = new URL(event.request.url);
+
+  // 索引清单：网络优先，离线时回退缓存
+  if (url.pathname === INDEX_URL) {
+    event.respondWith(
+      fetch(event.request)
+        .then(function(response) {
+          if (response.ok) {
+            const copy = response.clone();
+            caches.open(CACHE_NAME).then(function(cache) {
+              cache.put(INDEX_URL, copy);
+            });
+          }
+          return response;
+        })
+        .catch(function() {
+          return caches.match(INDEX_URL);
+        })
+    );
+    return;
+  }
+
+  // 科目分片 / 搜索索引：带 ?v=<md5> 版本参数，内容不可变，首次加载后缓存
+  if (url.pathname.startsWith('/public/data/') && url.searchParams.has('v')) {
+    event.respondWith(
+      caches.match(event.request).then(function(cached) {
+        if (cached) {
+          return cached;
+        }
+        return fetch(event.request).then(function(response) {
+          if (response.ok) {
+            const copy = response.clone();
+            caches.open(CACHE_NAME).then(function(cache) {
+              cache.put(event.request, copy);
+            });
+          }
+          return response;
+        });
+      })
+    );
+    return;
+  }
+
   event.respondWith(
     caches.match(event.request)
       .then(function(response) {